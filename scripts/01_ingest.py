@@ -8,6 +8,7 @@ from pathlib import Path
 from pipeline_io import read_rows, write_rows
 from pipeline_utils import (
     ChunkConfig,
+    LineIndex,
     chunk_text,
     dump_json,
     iter_transcript_files,
@@ -25,11 +26,34 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--transcripts-root", required=True)
     parser.add_argument("--output", default="data/ingest.parquet")
     parser.add_argument("--manifest", default="data/ingest_manifest.json")
+    parser.add_argument("--line-index", default="data/line_index.jsonl")
     parser.add_argument("--chunk-tokens", type=int, default=1400)
     parser.add_argument("--overlap-ratio", type=float, default=0.15)
     return parser.parse_args()
 
 
+def chunk_rows(text: str, rel_path: str, file_name: str, mtime: float, content_hash: str, cfg: ChunkConfig) -> list[dict]:
+    file_id = stable_id(rel_path)
+    rows = []
+    for chunk_text_value, start_offset, end_offset in chunk_text(text, cfg):
+        chunk_hash = sha256_text(chunk_text_value)
+        chunk_id = stable_id(file_id, str(start_offset), str(end_offset), chunk_hash)
+        rows.append(
+            {
+                "chunk_id": chunk_id,
+                "file_id": file_id,
+                "file_path": rel_path,
+                "file_name": file_name,
+                "modified_time": mtime,
+                "content_hash": content_hash,
+                "text": chunk_text_value,
+                "start_offset": start_offset,
+                "end_offset": end_offset,
+            }
+        )
+    return rows
+
+
 def main() -> None:
     args = parse_args()
     setup_logging("01_ingest")
@@ -43,10 +67,15 @@ def main() -> None:
         existing_rows = read_rows(str(output_path))
     except FileNotFoundError:
         existing_rows = []
+    try:
+        existing_index = {r["file_id"]: r for r in read_rows(args.line_index)}
+    except FileNotFoundError:
+        existing_index = {}
 
     cfg = ChunkConfig(chunk_tokens=args.chunk_tokens, overlap_ratio=args.overlap_ratio)
 
     all_rows: list[dict] = []
+    index_rows: list[dict] = []
     unchanged_file_ids: set[str] = set()
     seen_paths: set[str] = set()
 
@@ -63,26 +92,15 @@ def main() -> None:
         seen_paths.add(rel_path)
 
         prior = old_manifest.get(rel_path)
+        index_entry = existing_index.get(file_id)
+        if index_entry is None or index_entry.get("content_hash") != content_hash:
+            index_entry = {"file_id": file_id, "content_hash": content_hash, **LineIndex.from_text(raw).to_dict()}
+        index_rows.append(index_entry)
         if prior and prior.get("content_hash") == content_hash:
             unchanged_file_ids.add(file_id)
             continue
 
-        for chunk_text_value, start_offset, end_offset in chunk_text(text, cfg):
-            chunk_hash = sha256_text(chunk_text_value)
-            chunk_id = stable_id(file_id, str(start_offset), str(end_offset), chunk_hash)
-            all_rows.append(
-                {
-                    "chunk_id": chunk_id,
-                    "file_id": file_id,
-                    "file_path": rel_path,
-                    "file_name": file.name,
-                    "modified_time": mtime,
-                    "content_hash": content_hash,
-                    "text": chunk_text_value,
-                    "start_offset": start_offset,
-                    "end_offset": end_offset,
-                }
-            )
+        all_rows.extend(chunk_rows(text, rel_path, file.name, mtime, content_hash, cfg))
 
         old_manifest[rel_path] = {
             "file_id": file_id,
@@ -101,6 +119,8 @@ def main() -> None:
 
     all_rows.sort(key=lambda r: (r.get("file_path", ""), int(r.get("start_offset", 0))))
     written_path = write_rows(str(output_path), all_rows)
+    index_rows.sort(key=lambda r: r.get("file_id", ""))
+    write_rows(args.line_index, index_rows)
     dump_json(manifest_path, old_manifest)
 
     logging.info(
@@ -6,10 +6,26 @@ import json
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Iterable
 
+from pipeline_budget import (
+    RateLimiter,
+    TokenBudget,
+    check_cost_cap,
+    create_response,
+    estimate_tokens,
+    log_budget,
+    model_pricing,
+    project_run,
+)
 from pipeline_io import read_rows, write_rows
-from pipeline_utils import setup_logging
+from pipeline_utils import dump_json, load_json, setup_logging, sha256_text, stable_id
+
+CLASSIFIER_PROMPT_VERSION = "v1"
+CLASSIFIER_COMPLETION_TOKENS = 12
+CLASSIFIER_LATENCY_S = 1.0
 
 DEFAULT_KEYWORDS = [
     "resume",
@@ -37,7 +53,18 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--min-keyword-hits", type=int, default=1)
     parser.add_argument("--use-llm", action="store_true")
     parser.add_argument("--model", default="gpt-4o-mini")
-    return parser.parse_args()
+    parser.add_argument("--cache", default="data/jobsearch_llm_cache.json")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="max parallel LLM classifier calls")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"), help="override the OpenAI-compatible endpoint")
+    parser.add_argument("--max-tokens", type=int, help="hard cap on prompt+completion tokens for this run")
+    parser.add_argument("--max-cost-usd", type=float, help="hard cap on estimated spend for this run")
+    parser.add_argument("--max-rpm", type=int, help="ceiling on LLM requests per minute")
+    parser.add_argument("--price-input", type=float, help="USD per 1M prompt tokens (overrides built-in pricing)")
+    parser.add_argument("--price-output", type=float, help="USD per 1M completion tokens (overrides built-in pricing)")
+    parser.add_argument("--dry-run", action="store_true", help="estimate LLM tokens, cost and time without calling the API")
+    args = parser.parse_args()
+    check_cost_cap(parser, args)
+    return args
 
 
 def compile_keywords(custom_json: str | None) -> list[str]:
@@ -50,21 +77,71 @@ def compile_keyword_patterns(keywords: list[str]) -> dict[str, re.Pattern[str]]:
     return {kw: re.compile(rf"\b{re.escape(kw.lower())}\b") for kw in keywords}
 
 
-def keyword_hits(text: str, compiled_keywords: dict[str, re.Pattern[str]]) -> list[str]:
+def keyword_hits(text: str, compiled_keywords: dict[str, re.Pattern[str]] | Iterable[str]) -> list[str]:
+    """Keywords found in ``text``, in keyword order; a plain keyword list is compiled on the fly."""
+    if not isinstance(compiled_keywords, dict):
+        compiled_keywords = compile_keyword_patterns(list(compiled_keywords))
     lowered = text.lower()
     return [kw for kw, pattern in compiled_keywords.items() if pattern.search(lowered)]
 
 
-def llm_is_jobsearch(model: str, text: str) -> bool:
+class KeywordScanner:
+    """Finds every keyword in one pass over the text instead of one regex search per keyword.
+
+    Results equal ``keyword_hits``: longer keywords are tried first, shorter
+    keywords that are a prefix of the match are checked at the same spot,
+    and the scan resumes one character later so overlapping matches count.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        lowered = sorted({kw.lower() for kw in self.keywords}, key=len, reverse=True)
+        self.patterns = {kw: re.compile(rf"\b{re.escape(kw)}\b") for kw in lowered}
+        self.prefixes = {kw: [other for other in lowered if other != kw and kw.startswith(other)] for kw in lowered}
+        self.combined = re.compile(r"\b(?:" + "|".join(re.escape(kw) for kw in lowered) + r")\b") if lowered else None
+
+    def hits(self, text: str) -> list[str]:
+        if self.combined is None:
+            return []
+        lowered = text.lower()
+        found: set[str] = set()
+        pos = 0
+        while (match := self.combined.search(lowered, pos)) is not None:
+            keyword = match.group()
+            found.add(keyword)
+            for shorter in self.prefixes[keyword]:
+                if shorter not in found and self.patterns[shorter].match(lowered, match.start()):
+                    found.add(shorter)
+            pos = match.start() + 1
+        return [kw for kw in self.keywords if kw.lower() in found]
+
+
+def make_client(base_url: str | None = None) -> Any:
     from openai import OpenAI
 
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    prompt = (
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+
+def classifier_cache_key(model: str, text: str) -> str:
+    return stable_id(sha256_text(text), model, CLASSIFIER_PROMPT_VERSION)
+
+
+def classifier_prompt(text: str) -> str:
+    return (
         "Classify if this transcript chunk is about job-search coaching. "
         "Return only JSON: {\"job_search\": true|false}.\n\n"
         f"Chunk:\n{text[:4000]}"
     )
-    resp = client.responses.create(model=model, input=prompt)
+
+
+def llm_is_jobsearch(
+    client: Any,
+    model: str,
+    text: str,
+    budget: TokenBudget | None = None,
+    limiter: RateLimiter | None = None,
+) -> bool:
+    resp = create_response(client, model, classifier_prompt(text), CLASSIFIER_COMPLETION_TOKENS, budget, limiter)
     payload = resp.output_text.strip()
     try:
         data = json.loads(payload)
@@ -74,30 +151,104 @@ def llm_is_jobsearch(model: str, text: str) -> bool:
         return False
 
 
+def uncached_texts(model: str, texts: list[str], cache: dict) -> dict[str, str]:
+    pending: dict[str, str] = {}
+    for text in texts:
+        key = classifier_cache_key(model, text)
+        if key not in cache and key not in pending:
+            pending[key] = text
+    return pending
+
+
+def classify_texts(
+    client: Any,
+    model: str,
+    texts: list[str],
+    cache: dict,
+    concurrency: int = 4,
+    budget: TokenBudget | None = None,
+    limiter: RateLimiter | None = None,
+) -> list[bool]:
+    """Classify texts, reusing cached verdicts and calling the LLM concurrently for the rest."""
+    keys = [classifier_cache_key(model, text) for text in texts]
+    pending = uncached_texts(model, texts, cache)
+
+    logging.info("classifier cache hits: %s/%s, classifying %s", len(texts) - len(pending), len(texts), len(pending))
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {
+                key: pool.submit(llm_is_jobsearch, client, model, text, budget, limiter) for key, text in pending.items()
+            }
+            errors: list[Exception] = []
+            for key, future in futures.items():
+                try:
+                    cache[key] = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(exc)
+        if errors:
+            raise errors[0]
+    return [bool(cache[key]) for key in keys]
+
+
 def main() -> None:
     args = parse_args()
     setup_logging("02_filter_jobsearch")
 
     keywords = compile_keywords(args.keywords_json)
     rows = read_rows(args.input)
-    compiled_keywords = compile_keyword_patterns(keywords)
+    scanner = KeywordScanner(keywords)
     filtered: list[dict] = []
 
+    candidates: list[dict] = []
     for row in rows:
-        hits = keyword_hits(str(row.get("text", "")), compiled_keywords)
+        hits = scanner.hits(str(row.get("text", "")))
         row["keyword_hits"] = hits
         row["keyword_score"] = len(hits)
-        if row["keyword_score"] < args.min_keyword_hits:
-            continue
-        if args.use_llm:
-            if not os.getenv("OPENAI_API_KEY"):
-                raise RuntimeError("OPENAI_API_KEY must be set when --use-llm is enabled")
-            row["llm_jobsearch"] = llm_is_jobsearch(args.model, str(row.get("text", "")))
-            if not row["llm_jobsearch"]:
-                continue
-        else:
+        if row["keyword_score"] >= args.min_keyword_hits:
+            candidates.append(row)
+
+    if args.use_llm:
+        cache_path = Path(args.cache)
+        cache = load_json(cache_path, default={})
+        texts = [str(row.get("text", "")) for row in candidates]
+        pricing = model_pricing(args.model, args.price_input, args.price_output)
+        if args.dry_run:
+            pending = uncached_texts(args.model, texts, cache)
+            projection = project_run(
+                [estimate_tokens(classifier_prompt(text)) for text in pending.values()],
+                CLASSIFIER_COMPLETION_TOKENS,
+                args.model,
+                concurrency=args.llm_concurrency,
+                latency_s=CLASSIFIER_LATENCY_S,
+                max_rpm=args.max_rpm,
+                pricing=pricing,
+            )
+            logging.info("dry run projection: %s", json.dumps(projection))
+            return
+        if not os.getenv("OPENAI_API_KEY"):
+            raise RuntimeError("OPENAI_API_KEY must be set when --use-llm is enabled")
+        budget = TokenBudget(args.model, args.max_tokens, args.max_cost_usd, pricing)
+        try:
+            verdicts = classify_texts(
+                make_client(args.base_url),
+                args.model,
+                texts,
+                cache,
+                args.llm_concurrency,
+                budget,
+                RateLimiter(args.max_rpm),
+            )
+        finally:
+            dump_json(cache_path, cache)
+            log_budget("classifier usage", budget.summary())
+        for row, verdict in zip(candidates, verdicts):
+            row["llm_jobsearch"] = verdict
+            if verdict:
+                filtered.append(row)
+    else:
+        for row in candidates:
             row["llm_jobsearch"] = None
-        filtered.append(row)
+        filtered = candidates
 
     written = write_rows(args.output, filtered)
     logging.info("kept %s/%s chunks -> %s", len(filtered), len(rows), written)
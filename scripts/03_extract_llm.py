@@ -6,17 +6,49 @@ import json
 import logging
 import os
 import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
+from pipeline_budget import (
+    BudgetExceeded,
+    RateLimiter,
+    TokenBudget,
+    check_cost_cap,
+    create_response,
+    estimate_tokens,
+    log_budget,
+    model_pricing,
+    project_run,
+)
 from pipeline_io import read_rows
-from pipeline_utils import ensure_parent, load_json, setup_logging, stable_id
+from pipeline_utils import (
+    NUMBERED_LINE_RE,
+    LineIndex,
+    SimHashIndex,
+    chunk_numbered_lines,
+    dump_json,
+    ensure_parent,
+    load_json,
+    load_line_index,
+    setup_logging,
+    simhash,
+    stable_id,
+)
 
+EXTRACT_COMPLETION_TOKENS = 900
+EXTRACT_LATENCY_S = 8.0
+# Which extractor produced each route's result; it is stored with the cache entry.
+# Fallbacks after a failed or skipped model call (llm_failed, llm_planned) are not
+# cached, so a later backfill retries them and dry runs count them as calls.
+ROUTE_PRODUCERS = {"llm": "llm", "heuristic": "heuristic"}
 
 SCHEMA = {
-    "questions": [{"question_text": "", "ask_type": "", "speaker": "", "confidence": 0.0, "source_ref": {}}],
-    "concerns": [{"concern": "", "context": "", "emotion": "", "confidence": 0.0, "source_ref": {}}],
-    "advice": [{"advice": "", "category_tags": [], "intended_outcome": "", "confidence": 0.0, "source_ref": {}}],
+    "questions": [{"question_text": "", "ask_type": "", "speaker": "", "confidence": 0.0}],
+    "concerns": [{"concern": "", "context": "", "emotion": "", "confidence": 0.0}],
+    "advice": [{"advice": "", "category_tags": [], "intended_outcome": "", "confidence": 0.0}],
     "workflows": [
         {
             "title": "",
@@ -25,7 +57,6 @@ SCHEMA = {
             "common_failure_modes": [],
             "scripts_templates": [],
             "confidence": 0.0,
-            "source_ref": {},
         }
     ],
 }
@@ -37,8 +68,49 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--output", default="data/extractions.jsonl")
     p.add_argument("--cache", default="data/extraction_cache.json")
     p.add_argument("--model", default="gpt-4o-mini")
+    p.add_argument("--line-index", default="data/line_index.jsonl", help="per-file numbered-line index from ingest")
     p.add_argument("--rule-based", action="store_true", help="Use local heuristic extraction")
-    return p.parse_args()
+    p.add_argument(
+        "--near-dup-distance",
+        type=int,
+        default=3,
+        help="max SimHash bit distance for chunks to share one extraction; -1 disables",
+    )
+    p.add_argument(
+        "--routing",
+        choices=["llm", "cascade"],
+        default="llm",
+        help="llm: send every uncached chunk to the model; cascade: run heuristics first and only escalate promising chunks",
+    )
+    p.add_argument("--route-min-keyword-score", type=int, default=2)
+    p.add_argument("--route-min-heuristic-items", type=int, default=1)
+    p.add_argument("--stats", default="data/extraction_stats.json")
+    p.add_argument("--max-tokens", type=int, help="hard cap on prompt+completion tokens for this run")
+    p.add_argument("--max-cost-usd", type=float, help="hard cap on estimated spend for this run")
+    p.add_argument("--max-rpm", type=int, help="ceiling on LLM requests per minute")
+    p.add_argument("--price-input", type=float, help="USD per 1M prompt tokens (overrides built-in pricing)")
+    p.add_argument("--price-output", type=float, help="USD per 1M completion tokens (overrides built-in pricing)")
+    p.add_argument("--dry-run", action="store_true", help="estimate LLM tokens, cost and time without calling the API")
+    args = p.parse_args()
+    check_cost_cap(p, args)
+    return args
+
+
+@dataclass
+class RoutingPolicy:
+    min_keyword_score: int = 2
+    min_heuristic_items: int = 1
+
+
+def route_chunk(keyword_score: int, heuristic: dict, policy: RoutingPolicy) -> str:
+    """Decide whether a chunk's heuristic extraction is kept or the chunk is escalated to the LLM.
+
+    Chunks with few keyword hits or no heuristic findings are not worth a model call.
+    """
+    items = [item for kind in ("questions", "concerns", "advice", "workflows") for item in heuristic.get(kind, [])]
+    if keyword_score < policy.min_keyword_score or len(items) < policy.min_heuristic_items:
+        return "heuristic"
+    return "llm"
 
 
 def classify_ask_type(q: str) -> str:
@@ -59,24 +131,26 @@ def classify_ask_type(q: str) -> str:
     return "other"
 
 
-def heuristic_extract(text: str, source_ref: dict) -> dict:
-    sentences = re.split(r"(?<=[.!?])\s+", text)
+def heuristic_extract(text: str, numbered_lines: list[str] | None = None) -> dict:
+    """Rule-based extraction; ``numbered_lines`` comes from the ingest line index, since chunk text has no newlines."""
+    if numbered_lines is None:
+        numbered_lines = [ln.strip() for ln in text.splitlines() if NUMBERED_LINE_RE.match(ln.strip())]
     questions, concerns, advice = [], [], []
-    for sent in sentences:
+    for sent in re.split(r"(?<=[.!?])\s+", text):
         clean = sent.strip()
         if not clean:
             continue
+        lowered = clean.lower()
         if clean.endswith("?"):
-            questions.append({"question_text": clean, "ask_type": classify_ask_type(clean), "speaker": "unknown", "confidence": 0.55, "source_ref": source_ref})
-        if any(k in clean.lower() for k in ["worried", "struggling", "stuck", "concern", "afraid"]):
-            concerns.append({"concern": clean, "context": "", "emotion": "", "confidence": 0.5, "source_ref": source_ref})
-        if any(k in clean.lower() for k in ["should", "recommend", "try", "focus on", "need to"]):
-            advice.append({"advice": clean, "category_tags": [classify_ask_type(clean)], "intended_outcome": "", "confidence": 0.5, "source_ref": source_ref})
+            questions.append({"question_text": clean, "ask_type": classify_ask_type(clean), "speaker": "unknown", "confidence": 0.55})
+        if any(k in lowered for k in ["worried", "struggling", "stuck", "concern", "afraid"]):
+            concerns.append({"concern": clean, "context": "", "emotion": "", "confidence": 0.5})
+        if any(k in lowered for k in ["should", "recommend", "try", "focus on", "need to"]):
+            advice.append({"advice": clean, "category_tags": [classify_ask_type(clean)], "intended_outcome": "", "confidence": 0.5})
 
     workflows = []
-    numbered_lines = [ln.strip() for ln in text.splitlines() if re.match(r"^\d+[.)]\s+", ln.strip())]
     if len(numbered_lines) >= 3:
-        workflows.append({"title": "Extracted workflow", "when_to_use": "When facing related job-search scenario", "steps": numbered_lines, "common_failure_modes": [], "scripts_templates": [], "confidence": 0.45, "source_ref": source_ref})
+        workflows.append({"title": "Extracted workflow", "when_to_use": "When facing related job-search scenario", "steps": numbered_lines, "common_failure_modes": [], "scripts_templates": [], "confidence": 0.45})
 
     return {"questions": questions, "concerns": concerns, "advice": advice, "workflows": workflows}
 
@@ -110,17 +184,232 @@ def _extract_json_payload(response: Any) -> dict:
             return json.loads(match.group(1))
         raise
 
-def llm_extract(model: str, text: str, source_ref: dict) -> dict:
-    from openai import OpenAI
+def compact_extraction(extracted: dict) -> dict:
+    """Drop per-item ``source_ref`` copies; the record carries the chunk's ref once."""
+    return {
+        kind: [{k: v for k, v in item.items() if k != "source_ref"} for item in extracted.get(kind, []) if isinstance(item, dict)]
+        for kind in ("questions", "concerns", "advice", "workflows")
+    }
+
 
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def extraction_prompt(text: str) -> str:
     instruction = (
         "Extract coaching data into strict JSON with exactly these top-level keys: questions, concerns, advice, workflows. No prose.\n"
-        "Attach source_ref to every object using this exact source_ref: "
-        f"{json.dumps(source_ref)}\nSchema example:\n{json.dumps(SCHEMA)}\nUse empty arrays if none found."
+        f"Schema example:\n{json.dumps(SCHEMA)}\nUse empty arrays if none found."
     )
-    response = client.responses.create(model=model, input=f"{instruction}\n\nChunk:\n{text[:9000]}")
-    return _extract_json_payload(response)
+    return f"{instruction}\n\nChunk:\n{text[:9000]}"
+
+
+def make_client() -> Any:
+    from openai import OpenAI
+
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def llm_extract(
+    model: str,
+    text: str,
+    client: Any = None,
+    budget: TokenBudget | None = None,
+    limiter: RateLimiter | None = None,
+) -> dict:
+    if client is None:
+        client = make_client()
+    prompt = extraction_prompt(text)
+    response = create_response(client, model, prompt, EXTRACT_COMPLETION_TOKENS, budget, limiter)
+    return compact_extraction(_extract_json_payload(response))
+
+
+@dataclass
+class _GroupHead:
+    chunk_id: str
+    done: threading.Event = field(default_factory=threading.Event)
+    extracted: dict | None = None
+    producer: str | None = None
+
+
+class ChunkExtractor:
+    """Per-run extraction state: cache, near-duplicate index, routing, budget and route counts.
+
+    ``extract`` is safe to call from several threads; the streaming runner
+    shares one instance across its extraction workers.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        cache: dict,
+        rule_based: bool = False,
+        routing: str = "llm",
+        policy: RoutingPolicy | None = None,
+        near_dup_distance: int = 3,
+        dry_run: bool = False,
+        budget: TokenBudget | None = None,
+        limiter: RateLimiter | None = None,
+        line_index: dict[str, tuple[str, LineIndex]] | None = None,
+    ):
+        self.model = model
+        self.cache = cache
+        self.rule_based = rule_based
+        self.routing = routing
+        self.policy = policy or RoutingPolicy()
+        self.dry_run = dry_run
+        self.budget = budget or TokenBudget(model)
+        self.limiter = limiter or RateLimiter()
+        self.dup_index = SimHashIndex(near_dup_distance) if near_dup_distance >= 0 else None
+        self.group_heads: list[_GroupHead] = []
+        self.routes: Counter = Counter()
+        self.planned_prompt_tokens: list[int] = []
+        self.line_index = line_index if line_index is not None else {}
+        self._client = None
+        self._lock = threading.Lock()
+
+    def open_output(self, path: Path) -> TextIO:
+        """Open the records file; a dry run walks the same cache/near-duplicate/routing decisions but writes nothing."""
+        if self.dry_run:
+            return open(os.devnull, "w", encoding="utf-8")
+        ensure_parent(path)
+        return path.open("w", encoding="utf-8")
+
+    def save_cache(self, path: Path) -> None:
+        if self.dry_run:
+            return
+        ensure_parent(path)
+        path.write_text(json.dumps(self.cache, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+
+    def run_stats(self, concurrency: int = 1) -> dict:
+        """Route counts and LLM usage so far, plus a cost/time projection of the planned calls on a dry run."""
+        routes = self.routes
+        total = max(1, sum(routes.values()))
+        stats = {
+            "chunks": sum(routes.values()),
+            "routes": dict(routes),
+            "fractions": {name: round(count / total, 4) for name, count in routes.items()},
+            "llm_usage": self.budget.summary(),
+        }
+        if self.dry_run:
+            stats["projection"] = project_run(
+                self.planned_prompt_tokens,
+                EXTRACT_COMPLETION_TOKENS,
+                self.model,
+                concurrency=concurrency,
+                latency_s=EXTRACT_LATENCY_S,
+                max_rpm=self.limiter.max_rpm,
+                pricing=self.budget.pricing,
+            )
+            logging.info("dry run projection: %s", json.dumps(stats["projection"]))
+        else:
+            log_budget("extraction usage", stats["llm_usage"])
+        logging.info(
+            "routing: %s",
+            ", ".join(f"{name}={count} ({count / total:.1%})" for name, count in routes.most_common()),
+        )
+        return stats
+
+    def _llm(self, text: str) -> dict:
+        with self._lock:
+            if self._client is None:
+                self._client = make_client()
+        return llm_extract(self.model, text, self._client, self.budget, self.limiter)
+
+    def _llm_available(self) -> bool:
+        return not self.rule_based and (self.dry_run or bool(os.getenv("OPENAI_API_KEY")))
+
+    def _extract_uncached(self, row: dict, text: str) -> tuple[dict, str]:
+        use_llm = self._llm_available()
+        numbered_lines = chunk_numbered_lines(self.line_index, row)
+        heuristic = None
+        if self.routing == "cascade" or not use_llm:
+            heuristic = heuristic_extract(text, numbered_lines)
+        if heuristic is not None and (not use_llm or route_chunk(int(row.get("keyword_score") or 0), heuristic, self.policy) == "heuristic"):
+            return heuristic, "heuristic"
+        if self.dry_run:
+            with self._lock:
+                self.planned_prompt_tokens.append(estimate_tokens(extraction_prompt(text)))
+            return heuristic or heuristic_extract(text, numbered_lines), "llm_planned"
+        try:
+            return self._llm(text), "llm"
+        except Exception as exc:  # noqa: BLE001
+            message = str(exc)
+            if isinstance(exc, BudgetExceeded):
+                logging.warning("%s; switching to heuristic extraction for remaining chunks", exc)
+                self.rule_based = True
+            elif "insufficient_quota" in message:
+                logging.warning("OpenAI quota unavailable; switching to heuristic extraction for remaining chunks")
+                self.rule_based = True
+            logging.warning("LLM extraction failed for %s, using heuristic: %s", row.get("chunk_id"), exc)
+            return heuristic or heuristic_extract(text, numbered_lines), "llm_failed"
+
+    def extract(self, row: dict) -> dict:
+        source_ref = {
+            "file_id": row.get("file_id", ""),
+            "chunk_id": row.get("chunk_id", ""),
+            "start_offset": int(row.get("start_offset", 0)),
+            "end_offset": int(row.get("end_offset", 0)),
+            "file_path": row.get("file_path", ""),
+        }
+        text = str(row.get("text", ""))
+        key = stable_id(str(row.get("chunk_id", "")), self.model, "v1")
+        with self._lock:
+            cached = self.cache.get(key)
+        fingerprint = cached.get("simhash") if cached is not None else None
+        # Rule-based entries are only reused while the model is unavailable, so a
+        # later LLM run upgrades them. Entries without a producer predate it and
+        # are treated as model output.
+        if cached is not None and cached.get("producer", "llm") != "llm" and self._llm_available():
+            cached = None
+        # Fingerprints are stored with cache entries, so hits skip SimHash and
+        # still serve as heads for uncached near-duplicates later in the run.
+        if fingerprint is None and self.dup_index is not None:
+            fingerprint = simhash(text)
+
+        head = own_group = None
+        with self._lock:
+            if self.dup_index is not None:
+                found = self.dup_index.find(fingerprint)
+                if found is None:
+                    self.dup_index.add(fingerprint)
+                    own_group = _GroupHead(source_ref["chunk_id"])
+                    self.group_heads.append(own_group)
+                elif cached is None:
+                    head = self.group_heads[found]
+
+        extracted = producer = None
+        try:
+            if cached is not None:
+                extracted, route, producer = compact_extraction(cached), "cache", cached.get("producer", "llm")
+            elif head is not None:
+                # The group head may still be in flight on another worker.
+                head.done.wait()
+                if head.extracted is not None:
+                    extracted, route, producer = head.extracted, "near_duplicate", head.producer
+            if extracted is None:
+                extracted, route = self._extract_uncached(row, text)
+                producer = ROUTE_PRODUCERS.get(route)
+        finally:
+            if own_group is not None:
+                own_group.extracted = extracted
+                own_group.producer = producer
+                own_group.done.set()
+
+        with self._lock:
+            if producer is not None:
+                entry = {"producer": producer, **extracted}
+                if fingerprint is not None:
+                    entry["simhash"] = fingerprint
+                self.cache[key] = entry
+            self.routes[route] += 1
+
+        return {
+            "chunk_id": source_ref["chunk_id"],
+            "source_ref": source_ref,
+            "duplicate_of": head.chunk_id if head is not None else None,
+            "route": route,
+            "questions": extracted.get("questions", []),
+            "concerns": extracted.get("concerns", []),
+            "advice": extracted.get("advice", []),
+            "workflows": extracted.get("workflows", []),
+        }
 
 
 def main() -> None:
@@ -131,51 +420,32 @@ def main() -> None:
     cache_path = Path(args.cache)
     cache = load_json(cache_path, default={})
 
-    output_path = Path(args.output)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    pricing = model_pricing(args.model, args.price_input, args.price_output)
+    extractor = ChunkExtractor(
+        args.model,
+        cache,
+        rule_based=args.rule_based,
+        routing=args.routing,
+        policy=RoutingPolicy(
+            min_keyword_score=args.route_min_keyword_score,
+            min_heuristic_items=args.route_min_heuristic_items,
+        ),
+        near_dup_distance=args.near_dup_distance,
+        dry_run=args.dry_run,
+        budget=TokenBudget(args.model, args.max_tokens, args.max_cost_usd, pricing),
+        limiter=RateLimiter(args.max_rpm),
+        line_index=load_line_index(args.line_index),
+    )
 
-    with output_path.open("w", encoding="utf-8") as handle:
+    output_path = Path(args.output)
+    with extractor.open_output(output_path) as handle:
         for row in rows:
-            source_ref = {
-                "file_id": row.get("file_id", ""),
-                "chunk_id": row.get("chunk_id", ""),
-                "start_offset": int(row.get("start_offset", 0)),
-                "end_offset": int(row.get("end_offset", 0)),
-                "file_path": row.get("file_path", ""),
-            }
-            key = stable_id(str(row.get("chunk_id", "")), args.model, "v1")
-            if key in cache:
-                extracted = cache[key]
-            else:
-                if args.rule_based or not os.getenv("OPENAI_API_KEY"):
-                    extracted = heuristic_extract(str(row.get("text", "")), source_ref)
-                else:
-                    try:
-                        extracted = llm_extract(args.model, str(row.get("text", "")), source_ref)
-                    except Exception as exc:  # noqa: BLE001
-                        message = str(exc)
-                        if "insufficient_quota" in message:
-                            logging.warning("OpenAI quota unavailable; switching to heuristic extraction for remaining chunks")
-                            args.rule_based = True
-                        logging.warning("LLM extraction failed for %s, using heuristic: %s", row.get("chunk_id"), exc)
-                        extracted = heuristic_extract(str(row.get("text", "")), source_ref)
-                cache[key] = extracted
-
-            record = {
-                "chunk_id": row.get("chunk_id", ""),
-                "file_id": row.get("file_id", ""),
-                "file_path": row.get("file_path", ""),
-                "source_ref": source_ref,
-                "questions": extracted.get("questions", []),
-                "concerns": extracted.get("concerns", []),
-                "advice": extracted.get("advice", []),
-                "workflows": extracted.get("workflows", []),
-            }
-            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-    ensure_parent(cache_path)
-    cache_path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
-    logging.info("wrote extraction output to %s", output_path)
+            handle.write(json.dumps(extractor.extract(row), ensure_ascii=False) + "\n")
+
+    extractor.save_cache(cache_path)
+    dump_json(Path(args.stats), extractor.run_stats())
+    if not args.dry_run:
+        logging.info("wrote extraction output to %s", output_path)
 
 
 if __name__ == "__main__":
@@ -4,10 +4,9 @@ from __future__ import annotations
 import argparse
 import json
 from collections import Counter
-from difflib import SequenceMatcher
-from pathlib import Path
 
-from pipeline_io import write_rows
+from pipeline_cluster import cluster_groups
+from pipeline_io import ITEM_KINDS, read_extractions, write_rows
 from pipeline_utils import setup_logging
 
 
@@ -20,49 +19,42 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--workflows-output", default="data/workflows_index.csv")
     p.add_argument("--themes-output", default="data/themes_dashboard.csv")
     p.add_argument("--similarity-threshold", type=float, default=0.83)
+    p.add_argument(
+        "--block-by-category",
+        action="store_true",
+        help="cluster questions within ask_type and advice within first category tag, then merge borderline clusters across blocks",
+    )
+    p.add_argument("--merge-max-size", type=int, default=1, help="largest blocked cluster re-checked against other blocks")
+    p.add_argument("--workers", type=int, default=1, help="processes used to cluster item types/blocks in parallel")
     return p.parse_args()
 
 
-def load_jsonl(path: Path) -> list[dict]:
-    rows = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if line.strip():
-            rows.append(json.loads(line))
-    return rows
+def attach_duplicates(clusters: list[list[dict]], pairs: list[tuple[dict, dict]]) -> None:
+    """Append near-duplicate chunk items to the cluster holding their representative item."""
+    cluster_of = {id(item): cluster for cluster in clusters for item in cluster}
+    for head_item, dup_item in pairs:
+        cluster = cluster_of.get(id(head_item))
+        if cluster is not None:
+            cluster.append(dup_item)
 
 
-def near(a: str, b: str, threshold: float) -> bool:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio() >= threshold
+def resolve_ref(item: dict, refs: list[dict] | None) -> dict:
+    if refs is not None and "ref" in item:
+        return refs[item["ref"]]
+    return item.get("source_ref", {})
 
 
-def cluster_texts(items: list[dict], text_key: str, threshold: float) -> list[list[dict]]:
-    clusters: list[list[dict]] = []
-    for item in items:
-        text = item.get(text_key, "").strip()
-        if not text:
-            continue
-        placed = False
-        for cluster in clusters:
-            if near(text, cluster[0][text_key], threshold):
-                cluster.append(item)
-                placed = True
-                break
-        if not placed:
-            clusters.append([item])
-    return clusters
-
-
-def canonical_row(cluster: list[dict], text_key: str, item_type: str) -> dict:
+def canonical_row(cluster: list[dict], text_key: str, item_type: str, refs: list[dict] | None = None) -> dict:
     counts = Counter(it[text_key] for it in cluster)
     canonical_text = counts.most_common(1)[0][0]
     variants = sorted(counts.keys())
-    refs = [json.dumps(it.get("source_ref", {}), ensure_ascii=False) for it in cluster[:10]]
+    top_refs = [json.dumps(resolve_ref(it, refs), ensure_ascii=False) for it in cluster[:10]]
     return {
         "type": item_type,
         "canonical": canonical_text,
         "frequency": len(cluster),
         "variants": " | ".join(variants[:15]),
-        "top_source_refs": " || ".join(refs),
+        "top_source_refs": " || ".join(top_refs),
         "confidence_avg": round(sum(float(it.get("confidence", 0.0)) for it in cluster) / max(1, len(cluster)), 3),
     }
 
@@ -71,36 +63,55 @@ def main() -> None:
     args = parse_args()
     setup_logging("04_dedupe_cluster")
 
-    rows = load_jsonl(Path(args.input))
+    records = read_extractions(args.input)
 
     questions, concerns, advice, workflows = [], [], [], []
+    dup_pairs: dict[str, list[tuple[dict, dict]]] = {kind: [] for kind in ITEM_KINDS}
+    text_keys = {"questions": "question_text", "concerns": "concern", "advice": "advice", "workflows": "title"}
+    heads = {rec.chunk_id: rec for rec in records if not rec.duplicate_of}
+    # Items point at their chunk through a small integer into ``refs``; refs are expanded only in report rows.
+    refs = [rec.source_ref for rec in records]
     theme_counter = Counter()
 
-    for row in rows:
-        for q in row.get("questions", []):
-            questions.append(q)
+    for ref_idx, rec in enumerate(records):
+        head = heads.get(rec.duplicate_of) if rec.duplicate_of else None
+        for kind, bucket in zip(ITEM_KINDS, (questions, concerns, advice, workflows)):
+            head_items = getattr(head, kind) if head else []
+            for pos, item in enumerate(getattr(rec, kind)):
+                item["ref"] = ref_idx
+                head_item = head_items[pos] if pos < len(head_items) else None
+                if head_item is not None and head_item.get(text_keys[kind]) == item.get(text_keys[kind]):
+                    dup_pairs[kind].append((head_item, item))
+                else:
+                    bucket.append(item)
+        for q in rec.questions:
             theme_counter[q.get("ask_type", "other")] += 1
-        for c in row.get("concerns", []):
-            concerns.append(c)
-        for a in row.get("advice", []):
-            advice.append(a)
+        for a in rec.advice:
             for tag in a.get("category_tags", []):
                 theme_counter[tag] += 1
-        for w in row.get("workflows", []):
-            workflows.append(w)
-
-    q_clusters = cluster_texts(questions, "question_text", args.similarity_threshold)
-    c_clusters = cluster_texts(concerns, "concern", args.similarity_threshold)
-    a_clusters = cluster_texts(advice, "advice", args.similarity_threshold)
-    w_clusters = cluster_texts(workflows, "title", args.similarity_threshold)
 
-    questions_rows = [canonical_row(c, "question_text", "question") for c in q_clusters]
-    concerns_rows = [canonical_row(c, "concern", "concern") for c in c_clusters]
-    advice_rows = [canonical_row(c, "advice", "advice") for c in a_clusters]
+    q_field, a_field = ("ask_type", "category_tags") if args.block_by_category else (None, None)
+    q_clusters, c_clusters, a_clusters, w_clusters = cluster_groups(
+        [
+            (questions, "question_text", q_field),
+            (concerns, "concern", None),
+            (advice, "advice", a_field),
+            (workflows, "title", None),
+        ],
+        args.similarity_threshold,
+        workers=args.workers,
+        merge_max_size=args.merge_max_size,
+    )
+    for kind, clusters in zip(ITEM_KINDS, (q_clusters, c_clusters, a_clusters, w_clusters)):
+        attach_duplicates(clusters, dup_pairs[kind])
+
+    questions_rows = [canonical_row(c, "question_text", "question", refs) for c in q_clusters]
+    concerns_rows = [canonical_row(c, "concern", "concern", refs) for c in c_clusters]
+    advice_rows = [canonical_row(c, "advice", "advice", refs) for c in a_clusters]
 
     workflow_rows = []
     for c in w_clusters:
-        row = canonical_row(c, "title", "workflow")
+        row = canonical_row(c, "title", "workflow", refs)
         sample = c[0]
         row["when_to_use"] = sample.get("when_to_use", "")
         row["steps"] = " | ".join(sample.get("steps", []))
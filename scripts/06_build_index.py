@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from pipeline_index import connect, update_canonical, update_extractions
+from pipeline_io import iter_rows, read_rows
+from pipeline_utils import load_json, setup_logging
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Incrementally update the local SQLite query index")
+    p.add_argument("--input", default="data/extractions.jsonl")
+    p.add_argument("--db", default="data/index.sqlite")
+    p.add_argument("--manifest", default="data/ingest_manifest.json", help="ingest manifest with each file's modified time")
+    p.add_argument("--questions", default="data/questions_canonical.csv")
+    p.add_argument("--concerns", default="data/concerns_canonical.csv")
+    p.add_argument("--advice", default="data/advice_library.csv")
+    p.add_argument("--workflows", default="data/workflows_index.csv")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    setup_logging("06_build_index")
+
+    conn = connect(args.db)
+    manifest = load_json(Path(args.manifest), default={})
+    modified_times = {entry["file_id"]: entry["modified_time"] for entry in manifest.values() if "modified_time" in entry}
+    stats = update_extractions(conn, iter_rows(args.input), modified_times)
+    logging.info(
+        "indexed chunks: %s inserted, %s updated, %s unchanged, %s removed",
+        stats["inserted"],
+        stats["updated"],
+        stats["unchanged"],
+        stats["removed"],
+    )
+
+    for name, path in (
+        ("question", args.questions),
+        ("concern", args.concerns),
+        ("advice", args.advice),
+        ("workflow", args.workflows),
+    ):
+        try:
+            rows = read_rows(path)
+        except FileNotFoundError:
+            logging.warning("canonical output %s not found; skipping", path)
+            continue
+        if update_canonical(conn, name, rows):
+            logging.info("indexed %s canonical %s rows", len(rows), name)
+    conn.close()
+    logging.info("index ready at %s", args.db)
+
+
+if __name__ == "__main__":
+    main()
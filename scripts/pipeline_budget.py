@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+# USD per 1M tokens as (prompt, completion). Override with --price-input/--price-output for other models.
+PRICING_PER_1M = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used before a call is made."""
+    return max(1, len(text) // 4)
+
+
+def model_pricing(model: str, price_input: float | None = None, price_output: float | None = None) -> tuple[float, float] | None:
+    known = PRICING_PER_1M.get(model)
+    if price_input is None and price_output is None:
+        return known
+    base = known or (0.0, 0.0)
+    return (
+        price_input if price_input is not None else base[0],
+        price_output if price_output is not None else base[1],
+    )
+
+
+def check_cost_cap(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Reject ``--max-cost-usd`` at startup when the model has no built-in or explicit price."""
+    if args.max_cost_usd is not None and model_pricing(args.model, args.price_input, args.price_output) is None:
+        parser.error(f"no pricing known for model {args.model!r}; pass --price-input/--price-output to use --max-cost-usd")
+
+
+@dataclass
+class Reservation:
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class TokenBudget:
+    """Thread-safe prompt/completion token accounting with optional hard caps.
+
+    ``reserve`` is called before each request with estimated sizes and raises
+    ``BudgetExceeded`` if the call could push the run past a cap; ``record``
+    then swaps the reservation for the usage the API reports.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int | None = None,
+        max_cost_usd: float | None = None,
+        pricing: tuple[float, float] | None = None,
+    ):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.pricing = pricing if pricing is not None else model_pricing(model)
+        if max_cost_usd is not None and self.pricing is None:
+            raise ValueError(f"no pricing known for model {model!r}; pass explicit prices to enforce a cost cap")
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self._reserved_prompt = 0
+        self._reserved_completion = 0
+        self._lock = threading.Lock()
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float | None:
+        if self.pricing is None:
+            return None
+        return (prompt_tokens * self.pricing[0] + completion_tokens * self.pricing[1]) / 1_000_000
+
+    def reserve(self, prompt_tokens: int, completion_tokens: int) -> Reservation:
+        with self._lock:
+            projected_prompt = self.prompt_tokens + self._reserved_prompt + prompt_tokens
+            projected_completion = self.completion_tokens + self._reserved_completion + completion_tokens
+            if self.max_tokens is not None and projected_prompt + projected_completion > self.max_tokens:
+                raise BudgetExceeded(
+                    f"token budget of {self.max_tokens} would be exceeded "
+                    f"({self.prompt_tokens + self.completion_tokens} used)"
+                )
+            projected_cost = self.cost(projected_prompt, projected_completion)
+            if self.max_cost_usd is not None and projected_cost is not None and projected_cost > self.max_cost_usd:
+                raise BudgetExceeded(f"cost budget of ${self.max_cost_usd:.2f} would be exceeded")
+            self._reserved_prompt += prompt_tokens
+            self._reserved_completion += completion_tokens
+            return Reservation(prompt_tokens, completion_tokens)
+
+    def release(self, reservation: Reservation) -> None:
+        with self._lock:
+            self._reserved_prompt -= reservation.prompt_tokens
+            self._reserved_completion -= reservation.completion_tokens
+
+    def record(self, reservation: Reservation, prompt_tokens: int | None, completion_tokens: int | None) -> None:
+        with self._lock:
+            self._reserved_prompt -= reservation.prompt_tokens
+            self._reserved_completion -= reservation.completion_tokens
+            self.prompt_tokens += prompt_tokens if prompt_tokens is not None else reservation.prompt_tokens
+            self.completion_tokens += completion_tokens if completion_tokens is not None else reservation.completion_tokens
+            self.requests += 1
+
+    def summary(self) -> dict:
+        cost = self.cost(self.prompt_tokens, self.completion_tokens)
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(cost, 4) if cost is not None else None,
+        }
+
+
+class RateLimiter:
+    """Spaces request starts so no more than ``max_rpm`` begin in any minute."""
+
+    def __init__(self, max_rpm: int | None = None):
+        self.max_rpm = max_rpm
+        self.interval = 60.0 / max_rpm if max_rpm else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def response_usage(response: Any) -> tuple[int | None, int | None]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+
+
+def create_response(
+    client: Any,
+    model: str,
+    prompt: str,
+    expected_completion_tokens: int,
+    budget: TokenBudget | None = None,
+    limiter: RateLimiter | None = None,
+) -> Any:
+    """Call ``client.responses.create`` under the run's budget and rate limit."""
+    reservation = budget.reserve(estimate_tokens(prompt), expected_completion_tokens) if budget else None
+    if limiter:
+        limiter.wait()
+    try:
+        response = client.responses.create(model=model, input=prompt)
+    except Exception:
+        if budget and reservation:
+            budget.release(reservation)
+        raise
+    if budget and reservation:
+        budget.record(reservation, *response_usage(response))
+    return response
+
+
+def project_run(
+    prompt_tokens: list[int],
+    completion_tokens_per_call: int,
+    model: str,
+    concurrency: int = 1,
+    latency_s: float = 3.0,
+    max_rpm: int | None = None,
+    pricing: tuple[float, float] | None = None,
+) -> dict:
+    """Estimate tokens, cost and wall time for a batch of calls before any are made."""
+    requests = len(prompt_tokens)
+    prompt_total = sum(prompt_tokens)
+    completion_total = requests * completion_tokens_per_call
+    pricing = pricing if pricing is not None else model_pricing(model)
+    cost = None
+    if pricing is not None:
+        cost = round((prompt_total * pricing[0] + completion_total * pricing[1]) / 1_000_000, 4)
+    per_minute = max(1, concurrency) * 60.0 / max(latency_s, 1e-6)
+    if max_rpm:
+        per_minute = min(per_minute, float(max_rpm))
+    return {
+        "model": model,
+        "requests": requests,
+        "prompt_tokens": prompt_total,
+        "completion_tokens": completion_total,
+        "total_tokens": prompt_total + completion_total,
+        "cost_usd": cost,
+        "wall_time_s": round(requests / per_minute * 60.0, 1),
+    }
+
+
+def log_budget(label: str, summary: dict) -> None:
+    cost = summary.get("cost_usd")
+    logging.info(
+        "%s: %s requests, %s prompt + %s completion tokens, cost %s",
+        label,
+        summary.get("requests", 0),
+        summary.get("prompt_tokens", 0),
+        summary.get("completion_tokens", 0),
+        f"${cost:.4f}" if cost is not None else "unknown",
+    )
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+
+def near(a: str, b: str, threshold: float) -> bool:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio() >= threshold
+
+
+class Representative:
+    """A cluster's first member, lowercased once, with its SequenceMatcher side prepared.
+
+    ``near`` gives the same answer as the module-level ``near`` but rejects
+    most pairs with cheap upper bounds on ``ratio()`` before running it:
+    the length bound (what ``real_quick_ratio`` computes) and then
+    ``quick_ratio``, whose character counts for this side are cached too.
+    """
+
+    __slots__ = ("length", "matcher")
+
+    def __init__(self, text: str):
+        lowered = text.lower()
+        self.length = len(lowered)
+        self.matcher = SequenceMatcher(None)
+        self.matcher.set_seq2(lowered)
+
+    def near(self, lowered: str, threshold: float) -> bool:
+        total = len(lowered) + self.length
+        if total and 2.0 * min(len(lowered), self.length) / total < threshold:
+            return False
+        self.matcher.set_seq1(lowered)
+        return self.matcher.quick_ratio() >= threshold and self.matcher.ratio() >= threshold
+
+
+def cluster_text_indices(texts: list[str], threshold: float) -> list[list[int]]:
+    """Greedy clustering: each text joins the first cluster whose first member is near it.
+
+    Texts equal (after strip and lowercase) to one already placed reuse its
+    cluster without any comparisons: they would pass and fail exactly the
+    same checks against the clusters that existed when it was placed.
+    """
+    clusters: list[list[int]] = []
+    reps: list[Representative] = []
+    placed_by_text: dict[str, int] = {}
+    for idx, raw in enumerate(texts):
+        text = raw.strip()
+        if not text:
+            continue
+        lowered = text.lower()
+        target = placed_by_text.get(lowered)
+        if target is None:
+            target = next((c for c, rep in enumerate(reps) if rep.near(lowered, threshold)), None)
+        if target is not None:
+            clusters[target].append(idx)
+            placed_by_text.setdefault(lowered, target)
+            continue
+        clusters.append([idx])
+        reps.append(Representative(raw))
+        # A rep with surrounding whitespace is compared unstripped, so its own
+        # stripped text is not guaranteed to match it.
+        if raw == text or reps[-1].near(lowered, threshold):
+            placed_by_text[lowered] = len(clusters) - 1
+    return clusters
+
+
+def cluster_texts(items: list[dict], text_key: str, threshold: float) -> list[list[dict]]:
+    texts = [item.get(text_key, "") for item in items]
+    return [[items[i] for i in cluster] for cluster in cluster_text_indices(texts, threshold)]
+
+
+def block_key(item: dict, block_field: str | None) -> str:
+    if not block_field:
+        return "all"
+    value = item.get(block_field)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value or "other")
+
+
+def block_items(items: list[dict], block_field: str | None) -> dict[str, list[dict]]:
+    blocks: dict[str, list[dict]] = {}
+    for item in items:
+        blocks.setdefault(block_key(item, block_field), []).append(item)
+    return dict(sorted(blocks.items()))
+
+
+def merge_across_blocks(
+    blocks: list[list[list[dict]]],
+    text_key: str,
+    threshold: float,
+    max_size: int = 1,
+) -> list[list[dict]]:
+    """Fold small clusters into a near cluster from another block.
+
+    Blocking never compares items across categories, so a borderline item
+    tagged differently from its twins ends up alone. Clusters with at most
+    ``max_size`` members are re-checked against clusters from other blocks.
+    """
+    kept = [(b, cluster) for b, clusters in enumerate(blocks) for cluster in clusters if len(cluster) > max_size]
+    reps = [Representative(cluster[0][text_key]) for _, cluster in kept]
+    for b, clusters in enumerate(blocks):
+        for cluster in clusters:
+            if len(cluster) > max_size:
+                continue
+            lowered = cluster[0].get(text_key, "").strip().lower()
+            for (other_block, target), rep in zip(kept, reps):
+                if other_block != b and rep.near(lowered, threshold):
+                    target.extend(cluster)
+                    break
+            else:
+                kept.append((b, cluster))
+                reps.append(Representative(cluster[0][text_key]))
+    return [cluster for _, cluster in kept]
+
+
+def _cluster_task(task: tuple[list[str], float]) -> list[list[int]]:
+    return cluster_text_indices(*task)
+
+
+def cluster_groups(
+    groups: list[tuple[list[dict], str, str | None]],
+    threshold: float,
+    workers: int = 1,
+    merge_max_size: int = 1,
+) -> list[list[list[dict]]]:
+    """Cluster several independent ``(items, text_key, block_field)`` groups.
+
+    Every (group, block) pair is an independent task, so with ``workers > 1``
+    they run in a process pool. Workers receive only texts and return member
+    indices, keeping the original item objects in this process.
+    """
+    tasks: list[tuple[list[str], float]] = []
+    layout: list[tuple[str, list[list[dict]]]] = []
+    for items, text_key, block_field in groups:
+        blocks = list(block_items(items, block_field).values())
+        layout.append((text_key, blocks))
+        tasks.extend(([item.get(text_key, "") for item in block], threshold) for block in blocks)
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_cluster_task, tasks, chunksize=1))
+    else:
+        results = [_cluster_task(task) for task in tasks]
+
+    output: list[list[list[dict]]] = []
+    cursor = 0
+    for text_key, blocks in layout:
+        per_block = []
+        for block in blocks:
+            per_block.append([[block[i] for i in cluster] for cluster in results[cursor]])
+            cursor += 1
+        if len(per_block) == 1:
+            output.append(per_block[0])
+        else:
+            output.append(merge_across_blocks(per_block, text_key, threshold, merge_max_size))
+    return output
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+from pipeline_utils import normalize_whitespace, read_text_file, sha256_text
+
+ITEM_TEXT_KEYS = {
+    "questions": ("question", "question_text"),
+    "concerns": ("concern", "concern"),
+    "advice": ("advice", "advice"),
+    "workflows": ("workflow", "title"),
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    file_id TEXT,
+    file_path TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    record_hash TEXT,
+    modified_date TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    text TEXT NOT NULL,
+    ask_type TEXT,
+    confidence REAL,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS item_tags (
+    item_id INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS canonical (
+    id INTEGER PRIMARY KEY,
+    type TEXT,
+    canonical TEXT,
+    frequency INTEGER,
+    variants TEXT,
+    top_source_refs TEXT,
+    confidence_avg REAL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    content_hash TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(text);
+CREATE VIRTUAL TABLE IF NOT EXISTS canonical_fts USING fts5(canonical, variants);
+CREATE INDEX IF NOT EXISTS idx_chunks_file_id ON chunks(file_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_modified_date ON chunks(modified_date);
+CREATE INDEX IF NOT EXISTS idx_items_chunk_id ON items(chunk_id);
+CREATE INDEX IF NOT EXISTS idx_items_type_ask ON items(item_type, ask_type);
+CREATE INDEX IF NOT EXISTS idx_item_tags_tag ON item_tags(tag, item_id);
+CREATE INDEX IF NOT EXISTS idx_canonical_type ON canonical(type, frequency);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    db_path = Path(path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(chunks)")}
+    if columns and "modified_date" not in columns:
+        # Indexes built before dates were tracked; the changed record hash refills the column.
+        conn.execute("ALTER TABLE chunks ADD COLUMN modified_date TEXT")
+    conn.executescript(SCHEMA_SQL)
+    return conn
+
+
+def fts_query(text: str) -> str:
+    """Quote each term so user input is matched literally instead of parsed as FTS syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def modified_date(mtime: float | None) -> str | None:
+    return datetime.fromtimestamp(float(mtime)).date().isoformat() if mtime is not None else None
+
+
+def quarter_range(quarter: str) -> tuple[str, str]:
+    """``"2024-Q3"`` -> inclusive ISO date bounds ``("2024-07-01", "2024-09-30")``."""
+    match = re.fullmatch(r"(\d{4})-?[Qq]([1-4])", quarter.strip())
+    if not match:
+        raise ValueError(f"quarter must look like 2024-Q3, got {quarter!r}")
+    year, q = int(match.group(1)), int(match.group(2))
+    ends = {1: "03-31", 2: "06-30", 3: "09-30", 4: "12-31"}
+    return f"{year}-{3 * q - 2:02d}-01", f"{year}-{ends[q]}"
+
+
+def item_text(kind: str, item: dict) -> str:
+    text = str(item.get(ITEM_TEXT_KEYS[kind][1], "") or "")
+    if kind == "workflows" and item.get("steps"):
+        text = text + " " + " ".join(str(step) for step in item.get("steps", []))
+    return text.strip()
+
+
+def _delete_chunk(conn: sqlite3.Connection, chunk_id: str) -> None:
+    item_ids = [row[0] for row in conn.execute("SELECT id FROM items WHERE chunk_id = ?", (chunk_id,))]
+    conn.executemany("DELETE FROM items_fts WHERE rowid = ?", [(i,) for i in item_ids])
+    conn.executemany("DELETE FROM item_tags WHERE item_id = ?", [(i,) for i in item_ids])
+    conn.execute("DELETE FROM items WHERE chunk_id = ?", (chunk_id,))
+    conn.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+
+
+def _insert_record(conn: sqlite3.Connection, record: dict, record_hash: str, date: str | None) -> None:
+    ref = record.get("source_ref") or {}
+    chunk_id = str(record.get("chunk_id", "") or ref.get("chunk_id", ""))
+    conn.execute(
+        "INSERT INTO chunks (chunk_id, file_id, file_path, start_offset, end_offset, record_hash, modified_date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            chunk_id,
+            record.get("file_id", ref.get("file_id", "")),
+            record.get("file_path", ref.get("file_path", "")),
+            int(ref.get("start_offset", 0)),
+            int(ref.get("end_offset", 0)),
+            record_hash,
+            date,
+        ),
+    )
+    for kind, (item_type, _) in ITEM_TEXT_KEYS.items():
+        for item in record.get(kind, []):
+            text = item_text(kind, item)
+            if not text:
+                continue
+            cur = conn.execute(
+                "INSERT INTO items (chunk_id, item_type, text, ask_type, confidence, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    chunk_id,
+                    item_type,
+                    text,
+                    item.get("ask_type"),
+                    float(item.get("confidence", 0.0) or 0.0),
+                    json.dumps(item, ensure_ascii=False),
+                ),
+            )
+            item_id = cur.lastrowid
+            conn.execute("INSERT INTO items_fts (rowid, text) VALUES (?, ?)", (item_id, text))
+            tags = {str(tag) for tag in item.get("category_tags", []) or []}
+            conn.executemany("INSERT INTO item_tags (item_id, tag) VALUES (?, ?)", [(item_id, tag) for tag in sorted(tags)])
+
+
+def update_extractions(
+    conn: sqlite3.Connection,
+    records: Iterable[dict],
+    modified_times: dict[str, float] | None = None,
+) -> dict:
+    """Bring the item tables in line with ``records``, touching only chunks whose record changed.
+
+    ``modified_times`` maps file_id to the transcript's mtime (from the ingest
+    manifest) and fills the date column used by ``since``/``until``/``quarter``.
+    """
+    modified_times = modified_times or {}
+    existing = {row["chunk_id"]: row["record_hash"] for row in conn.execute("SELECT chunk_id, record_hash FROM chunks")}
+    seen: set[str] = set()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    with conn:
+        for record in records:
+            chunk_id = str(record.get("chunk_id", "") or (record.get("source_ref") or {}).get("chunk_id", ""))
+            if not chunk_id or chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            ref = record.get("source_ref") or {}
+            date = modified_date(modified_times.get(str(record.get("file_id", "") or ref.get("file_id", ""))))
+            indexed = {key: record.get(key) for key in ("source_ref", *ITEM_TEXT_KEYS)}
+            indexed["modified_date"] = date
+            record_hash = sha256_text(json.dumps(indexed, sort_keys=True, ensure_ascii=False))
+            prior = existing.get(chunk_id)
+            if prior == record_hash:
+                stats["unchanged"] += 1
+                continue
+            if prior is not None:
+                _delete_chunk(conn, chunk_id)
+                stats["updated"] += 1
+            else:
+                stats["inserted"] += 1
+            _insert_record(conn, record, record_hash, date)
+        for chunk_id in set(existing) - seen:
+            _delete_chunk(conn, chunk_id)
+            stats["removed"] += 1
+    return stats
+
+
+def update_canonical(conn: sqlite3.Connection, name: str, rows: list[dict]) -> bool:
+    """Replace one canonical output's rows if its content changed since the last build."""
+    content_hash = sha256_text(json.dumps(rows, sort_keys=True, ensure_ascii=False, default=str))
+    prior = conn.execute("SELECT content_hash FROM sources WHERE name = ?", (name,)).fetchone()
+    if prior and prior["content_hash"] == content_hash:
+        return False
+    item_type = rows[0].get("type", name) if rows else name
+    with conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM canonical WHERE type = ?", (item_type,))]
+        conn.executemany("DELETE FROM canonical_fts WHERE rowid = ?", [(i,) for i in ids])
+        conn.execute("DELETE FROM canonical WHERE type = ?", (item_type,))
+        for row in rows:
+            cur = conn.execute(
+                "INSERT INTO canonical (type, canonical, frequency, variants, top_source_refs, confidence_avg) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    row.get("type", item_type),
+                    str(row.get("canonical", "")),
+                    int(row.get("frequency", 0) or 0),
+                    str(row.get("variants", "") or ""),
+                    str(row.get("top_source_refs", "") or ""),
+                    float(row.get("confidence_avg", 0.0) or 0.0),
+                ),
+            )
+            conn.execute(
+                "INSERT INTO canonical_fts (rowid, canonical, variants) VALUES (?, ?, ?)",
+                (cur.lastrowid, str(row.get("canonical", "")), str(row.get("variants", "") or "")),
+            )
+        conn.execute("INSERT OR REPLACE INTO sources (name, content_hash) VALUES (?, ?)", (name, content_hash))
+    return True
+
+
+def search_items(
+    conn: sqlite3.Connection,
+    text: str | None = None,
+    item_type: str | None = None,
+    ask_type: str | None = None,
+    tag: str | None = None,
+    file_id: str | None = None,
+    file_path: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    quarter: str | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    clauses: list[str] = []
+    params: list = []
+    if quarter:
+        q_start, q_end = quarter_range(quarter)
+        since, until = max(since or q_start, q_start), min(until or q_end, q_end)
+    query = fts_query(text or "")
+    if query:
+        clauses.append("i.id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+        params.append(query)
+    if item_type:
+        clauses.append("i.item_type = ?")
+        params.append(item_type)
+    if ask_type:
+        clauses.append("i.ask_type = ?")
+        params.append(ask_type)
+    if tag:
+        clauses.append("i.id IN (SELECT item_id FROM item_tags WHERE tag = ?)")
+        params.append(tag)
+    if file_id:
+        clauses.append("c.file_id = ?")
+        params.append(file_id)
+    if file_path:
+        clauses.append("c.file_path GLOB ?")
+        params.append(file_path if any(ch in file_path for ch in "*?[") else f"*{file_path}*")
+    if since:
+        clauses.append("c.modified_date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("c.modified_date <= ?")
+        params.append(until)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    sql = (
+        "SELECT i.id, i.item_type, i.text, i.ask_type, i.confidence, i.payload, "
+        "c.chunk_id, c.file_id, c.file_path, c.start_offset, c.end_offset, c.modified_date "
+        f"FROM items i JOIN chunks c ON c.chunk_id = i.chunk_id {where} ORDER BY i.id LIMIT ?"
+    )
+    params.append(int(limit))
+    results = []
+    for row in conn.execute(sql, params):
+        payload = json.loads(row["payload"] or "{}")
+        results.append(
+            {
+                "id": row["id"],
+                "type": row["item_type"],
+                "text": row["text"],
+                "ask_type": row["ask_type"],
+                "category_tags": payload.get("category_tags", []),
+                "confidence": row["confidence"],
+                "modified_date": row["modified_date"],
+                "source_ref": {
+                    "file_id": row["file_id"],
+                    "chunk_id": row["chunk_id"],
+                    "start_offset": row["start_offset"],
+                    "end_offset": row["end_offset"],
+                    "file_path": row["file_path"],
+                },
+            }
+        )
+    return results
+
+
+def search_canonical(conn: sqlite3.Connection, text: str | None = None, item_type: str | None = None, limit: int = 50) -> list[dict]:
+    clauses: list[str] = []
+    params: list = []
+    query = fts_query(text or "")
+    if query:
+        clauses.append("id IN (SELECT rowid FROM canonical_fts WHERE canonical_fts MATCH ?)")
+        params.append(query)
+    if item_type:
+        clauses.append("type = ?")
+        params.append(item_type)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    sql = (
+        "SELECT type, canonical, frequency, variants, top_source_refs, confidence_avg "
+        f"FROM canonical {where} ORDER BY frequency DESC, id LIMIT ?"
+    )
+    params.append(int(limit))
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def chunk_ref(conn: sqlite3.Connection, chunk_id: str) -> dict | None:
+    row = conn.execute(
+        "SELECT chunk_id, file_id, file_path, start_offset, end_offset FROM chunks WHERE chunk_id = ?", (chunk_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def source_excerpt(transcripts_root: str, source_ref: dict) -> str:
+    """Return the transcript words a ``source_ref`` points at (offsets are word positions after ingest)."""
+    path = Path(transcripts_root) / str(source_ref.get("file_path", ""))
+    if not path.is_file():
+        raise FileNotFoundError(path)
+    words = normalize_whitespace(read_text_file(path)).split()
+    return " ".join(words[int(source_ref.get("start_offset", 0)) : int(source_ref.get("end_offset", 0))])
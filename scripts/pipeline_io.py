@@ -2,8 +2,19 @@ from __future__ import annotations
 
 import json
 import logging
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
+
+# orjson is an optional extra (not in requirements.txt); it roughly halves JSONL decode time.
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - optional speedup
+    _loads = json.loads
+
+ITEM_KINDS = ("questions", "concerns", "advice", "workflows")
 
 
 def _read_jsonl(path: Path) -> list[dict]:
@@ -46,6 +57,34 @@ def read_rows(path_str: str) -> list[dict]:
     raise FileNotFoundError(path)
 
 
+def iter_rows(path_str: str, batch_size: int = 1024) -> Iterator[dict]:
+    """Yield rows one at a time without loading the whole table.
+
+    JSONL (including the tabular fallback) is streamed line by line and
+    parquet in ``batch_size``-row batches through pyarrow. Without pyarrow,
+    parquet and CSV go through read_rows and are loaded in full.
+    """
+    path = Path(path_str)
+    if not path.exists() and path.suffix in {".parquet", ".csv"} and path.with_suffix(".jsonl").exists():
+        path = path.with_suffix(".jsonl")
+    if path.exists() and path.suffix == ".jsonl":
+        with path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+        return
+    if path.exists() and path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            logging.warning("pyarrow not installed; loading all of %s into memory", path)
+        else:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                yield from batch.to_pylist()
+            return
+    yield from read_rows(path_str)
+
+
 def write_rows(path_str: str, rows: list[dict]) -> Path:
     path = Path(path_str)
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -78,3 +117,41 @@ def markdown_table(rows: list[dict], columns: list[str], max_rows: int = 50) ->
     for row in shown:
         body += "| " + " | ".join(str(row.get(c, "")) for c in columns) + " |\n"
     return header + sep + body
+
+
+@dataclass(slots=True)
+class ExtractionRecord:
+    chunk_id: str
+    source_ref: dict
+    duplicate_of: str | None = None
+    questions: list[dict] = field(default_factory=list)
+    concerns: list[dict] = field(default_factory=list)
+    advice: list[dict] = field(default_factory=list)
+    workflows: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "ExtractionRecord":
+        source_ref = row.get("source_ref") or {}
+        record = cls(
+            chunk_id=str(row.get("chunk_id") or source_ref.get("chunk_id", "")),
+            source_ref=source_ref,
+            duplicate_of=row.get("duplicate_of"),
+        )
+        for kind in ITEM_KINDS:
+            items = row.get(kind) or []
+            # Older extraction files repeated the chunk's source_ref inside every item.
+            if any("source_ref" in item for item in items):
+                items = [{k: v for k, v in item.items() if k != "source_ref"} for item in items]
+            setattr(record, kind, items)
+        return record
+
+
+def read_extractions(path_str: str) -> list[ExtractionRecord]:
+    """Decode ``extractions.jsonl`` line by line (orjson when installed) into typed records."""
+    path = Path(path_str)
+    records = []
+    with path.open("rb") as f:
+        for line in f:
+            if line.strip():
+                records.append(ExtractionRecord.from_dict(_loads(line)))
+    return records
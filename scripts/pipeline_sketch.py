@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+from typing import Iterable
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse spaces so trivially different phrasings share a key."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+class SpaceSaving:
+    """Weighted Space-Saving heavy hitters with at most ``capacity`` counters.
+
+    Every reported count overestimates the true weight by at most its
+    ``error``, and any item heavier than ``total / capacity`` is guaranteed
+    to be tracked.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = max(1, capacity)
+        self.counts: dict[str, float] = {}
+        self.errors: dict[str, float] = {}
+        self.examples: dict[str, str] = {}
+        self.total = 0.0
+
+    def add(self, key: str, weight: float = 1.0, example: str | None = None) -> None:
+        self.total += weight
+        if key in self.counts:
+            self.counts[key] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            evicted = min(self.counts, key=self.counts.__getitem__)
+            floor = self.counts.pop(evicted)
+            self.errors.pop(evicted, None)
+            self.examples.pop(evicted, None)
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        self.examples[key] = example if example is not None else key
+
+    def top(self, n: int) -> list[tuple[str, float, float]]:
+        """``(key, count, error)`` for the ``n`` heaviest counters."""
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+
+class CountMinSketch:
+    """Count-Min sketch: estimates never undercount and overcount by at most
+    ``epsilon * total`` with probability ``1 - delta``."""
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.epsilon = math.e / self.width
+        self.delta = delta
+        self.table = [[0.0] * self.width for _ in range(self.depth)]
+        self.total = 0.0
+
+    def _columns(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8", errors="ignore"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, weight: float = 1.0) -> None:
+        self.total += weight
+        for row, col in enumerate(self._columns(key)):
+            self.table[row][col] += weight
+
+    def estimate(self, key: str) -> float:
+        return min(self.table[row][col] for row, col in enumerate(self._columns(key)))
+
+    def error_bound(self) -> float:
+        return self.epsilon * self.total
+
+
+def stratified_sample(
+    rows: Iterable[dict],
+    per_file: int,
+    max_chunks: int,
+    rng: random.Random,
+) -> tuple[list[tuple[dict, float]], dict]:
+    """Reservoir-sample up to ``per_file`` chunks from every file in one pass.
+
+    Returns ``(row, weight)`` pairs whose weights sum to the corpus chunk
+    count, so weighted tallies over the sample estimate corpus-wide counts.
+    If the per-file samples exceed ``max_chunks``, each file's sample is cut
+    down to an equal share of the cap. When there are more files than the
+    cap, that many files are sampled with one chunk each, and the kept files
+    are scaled up to stand in for the dropped ones.
+    """
+    per_file = max(1, per_file)
+    seen: dict[str, int] = {}
+    reservoirs: dict[str, list[dict]] = {}
+    for row in rows:
+        file_id = str(row.get("file_id", ""))
+        n = seen.get(file_id, 0) + 1
+        seen[file_id] = n
+        reservoir = reservoirs.setdefault(file_id, [])
+        if len(reservoir) < per_file:
+            reservoir.append(row)
+        else:
+            slot = rng.randrange(n)
+            if slot < per_file:
+                reservoir[slot] = row
+
+    file_ids = sorted(reservoirs)
+    if sum(len(reservoirs[f]) for f in file_ids) > max_chunks:
+        quota = max_chunks // len(file_ids) if file_ids else 0
+        if quota == 0:
+            # More files than the cap allows: sample files, one chunk each.
+            rng.shuffle(file_ids)
+            file_ids = sorted(file_ids[: max(0, max_chunks)])
+            quota = 1
+        for file_id in file_ids:
+            if len(reservoirs[file_id]) > quota:
+                reservoirs[file_id] = rng.sample(reservoirs[file_id], quota)
+
+    total_chunks = sum(seen.values())
+    kept_chunks = sum(seen[f] for f in file_ids)
+    scale = total_chunks / kept_chunks if kept_chunks else 0.0
+    sample = [(row, seen[f] / len(reservoirs[f]) * scale) for f in file_ids for row in reservoirs[f]]
+    stats = {
+        "files": len(seen),
+        "chunks": total_chunks,
+        "sampled_files": len(file_ids),
+        "sampled_chunks": len(sample),
+    }
+    return sample, stats
+
+
+def estimate_range(estimate: float, sketch_error: float, mean_weight: float, z: float = 1.96) -> tuple[float, float]:
+    """Bounds on a weighted count: sketch overcount plus a Poisson-style sampling margin."""
+    margin = z * math.sqrt(max(estimate, 0.0) * max(mean_weight, 1.0))
+    return max(0.0, estimate - sketch_error - margin), estimate + margin
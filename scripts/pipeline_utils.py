@@ -4,8 +4,11 @@ import hashlib
 import json
 import logging
 import re
+import sys
+from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
+from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
 from typing import Iterable
 
@@ -24,6 +27,16 @@ def setup_logging(name: str) -> None:
     logging.info("starting %s", name)
 
 
+def load_stage(file_name: str, module_name: str):
+    """Import a numbered stage script (e.g. ``03_extract_llm.py``) from the scripts folder as a module."""
+    spec = spec_from_file_location(module_name, Path(__file__).resolve().parent / file_name)
+    module = module_from_spec(spec)
+    assert spec.loader is not None
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
 def sha256_text(value: str) -> str:
     return hashlib.sha256(value.encode("utf-8", errors="ignore")).hexdigest()
 
@@ -87,3 +100,134 @@ def chunk_text(text: str, cfg: ChunkConfig) -> list[tuple[str, int, int]]:
         chunks.append((chunk, cursor, cursor + len(window)))
         cursor += step
     return chunks
+
+
+NUMBERED_LINE_RE = re.compile(r"^\d+[.)]\s+")
+
+
+@dataclass
+class LineIndex:
+    """Per-file numbered-line boundaries as word offsets.
+
+    Ingest collapses newlines, so chunk text alone cannot tell where a
+    ``1.``/``2)`` line started. Offsets count words of the normalized text,
+    the same unit as chunk ``start_offset``/``end_offset``, so any chunk
+    window can recover the numbered lines it fully contains.
+    """
+
+    numbered_lines: list[tuple[int, int]]
+
+    @classmethod
+    def from_text(cls, raw: str) -> "LineIndex":
+        numbered_lines = []
+        cursor = 0
+        for line in raw.splitlines():
+            count = len(line.split())
+            if NUMBERED_LINE_RE.match(line.strip()):
+                numbered_lines.append((cursor, cursor + count))
+            cursor += count
+        return cls(numbered_lines)
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "LineIndex":
+        return cls([(int(a), int(b)) for a, b in payload.get("numbered_lines", [])])
+
+    def to_dict(self) -> dict:
+        return {"numbered_lines": [list(n) for n in self.numbered_lines]}
+
+    def window(self, chunk: str, start: int, end: int) -> list[str]:
+        spans = [(a, b) for a, b in self.numbered_lines if a >= start and b <= end]
+        if not spans:
+            return []
+        words = chunk.split()
+        return [" ".join(words[a - start : b - start]) for a, b in spans]
+
+
+def load_line_index(path_str: str, file_ids: set[str] | None = None) -> dict[str, tuple[str, LineIndex]]:
+    """Map file_id -> (content_hash, LineIndex) from the ingest side file, if present."""
+    path = Path(path_str)
+    if not path.exists():
+        return {}
+    index = {}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if file_ids is None or row["file_id"] in file_ids:
+                index[row["file_id"]] = (row.get("content_hash", ""), LineIndex.from_dict(row))
+    return index
+
+
+def chunk_numbered_lines(index: dict[str, tuple[str, LineIndex]], row: dict) -> list[str] | None:
+    """Numbered lines inside a chunk row, or None when the index is missing or stale for its file."""
+    entry = index.get(str(row.get("file_id", "")))
+    if entry is None or entry[0] != row.get("content_hash"):
+        return None
+    return entry[1].window(str(row.get("text", "")), int(row.get("start_offset", 0)), int(row.get("end_offset", 0)))
+
+
+# Byte value -> its 8 bits spread into 32-bit lanes, so summing spread bytes counts set bits per position.
+_SPREAD_BYTE = [sum(1 << (bit * 32) for bit in range(8) if (value >> bit) & 1) for value in range(256)]
+_LANE_MASK = (1 << 32) - 1
+
+
+def simhash(text: str, shingle_words: int = 3) -> int:
+    """64-bit SimHash over lowercase word shingles; near-identical texts land a few bits apart."""
+    words = text.lower().split()
+    if not words:
+        return 0
+    width = min(shingle_words, len(words))
+    grams = Counter(" ".join(words[i : i + width]) for i in range(len(words) - width + 1))
+    # Digests laid end to end (repeated per occurrence); byte ``pos`` of every
+    # digest is then data[pos::8], and its value histogram gives per-bit counts.
+    data = b"".join(
+        hashlib.blake2b(gram.encode("utf-8", errors="ignore"), digest_size=8).digest() * count for gram, count in grams.items()
+    )
+    lanes = [sum(_SPREAD_BYTE[value] * n for value, n in Counter(data[pos::8]).items()) for pos in range(8)]
+    total = sum(grams.values())
+    fingerprint = 0
+    for pos, lane in enumerate(lanes):
+        base = 8 * (7 - pos)
+        for bit in range(8):
+            if 2 * ((lane >> (bit * 32)) & _LANE_MASK) > total:
+                fingerprint |= 1 << (base + bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """Finds previously added fingerprints within ``max_distance`` bits.
+
+    Fingerprints are split into ``max_distance + 1`` bands; by pigeonhole any
+    match shares at least one band exactly, so only bucket mates are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max(0, min(max_distance, 63))
+        bands = self.max_distance + 1
+        width = -(-64 // bands)
+        self._bands = [(start, min(width, 64 - start)) for start in range(0, 64, width)]
+        self._buckets: list[dict[int, list[int]]] = [{} for _ in self._bands]
+        self.fingerprints: list[int] = []
+
+    def _band_keys(self, fingerprint: int) -> list[int]:
+        return [(fingerprint >> start) & ((1 << size) - 1) for start, size in self._bands]
+
+    def find(self, fingerprint: int) -> int | None:
+        best: int | None = None
+        for bucket, key in zip(self._buckets, self._band_keys(fingerprint)):
+            for idx in bucket.get(key, []):
+                if (best is None or idx < best) and hamming_distance(fingerprint, self.fingerprints[idx]) <= self.max_distance:
+                    best = idx
+        return best
+
+    def add(self, fingerprint: int) -> int:
+        idx = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        for bucket, key in zip(self._buckets, self._band_keys(fingerprint)):
+            bucket.setdefault(key, []).append(idx)
+        return idx
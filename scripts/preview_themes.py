@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Approximate themes summary in about a minute, on any corpus size.
+
+Samples a few chunks per transcript, runs the keyword filter and heuristic
+extraction on them, and tallies questions and themes in fixed-size
+sketches instead of clustering. Counts are scaled back up to the full
+corpus and reported with ranges, so treat the result as a preview of what
+the full run (stages 02-05) will say, not a replacement for it.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import time
+from pathlib import Path
+
+from pipeline_io import iter_rows, markdown_table
+from pipeline_sketch import CountMinSketch, SpaceSaving, estimate_range, normalize_question, stratified_sample
+from pipeline_utils import chunk_numbered_lines, load_line_index, load_stage, setup_logging
+
+filter_mod = load_stage("02_filter_jobsearch.py", "filter_stage")
+extract_mod = load_stage("03_extract_llm.py", "extract_stage")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Fast approximate preview of top themes and questions")
+    p.add_argument("--input", default="data/ingest.parquet")
+    p.add_argument("--line-index", default="data/line_index.jsonl")
+    p.add_argument("--outputs-dir", default="outputs/preview")
+    p.add_argument("--sample-per-file", type=int, default=3, help="chunks sampled from each transcript")
+    p.add_argument("--max-chunks", type=int, default=2000, help="cap on sampled chunks across the corpus")
+    p.add_argument("--seed", type=int, default=13)
+    p.add_argument("--keywords-json", help="optional JSON list of keywords")
+    p.add_argument("--min-keyword-hits", type=int, default=1)
+    p.add_argument("--capacity", type=int, default=500, help="question counters kept by the heavy-hitter sketch")
+    return p.parse_args()
+
+
+def fmt(value: float) -> str:
+    return str(int(round(value)))
+
+
+def main() -> None:
+    args = parse_args()
+    setup_logging("preview_themes")
+    started = time.monotonic()
+
+    sample, stats = stratified_sample(iter_rows(args.input), args.sample_per_file, args.max_chunks, random.Random(args.seed))
+    keywords = filter_mod.compile_keywords(args.keywords_json)
+    scanner = filter_mod.KeywordScanner(keywords)
+    line_index = load_line_index(args.line_index, {str(row.get("file_id", "")) for row, _ in sample})
+
+    questions = SpaceSaving(args.capacity)
+    themes = CountMinSketch()
+    theme_keys: set[str] = set()
+    kept = 0
+    for row, weight in sample:
+        text = str(row.get("text", ""))
+        if len(scanner.hits(text)) < args.min_keyword_hits:
+            continue
+        kept += 1
+        extracted = extract_mod.heuristic_extract(text, chunk_numbered_lines(line_index, row))
+        for q in extracted["questions"]:
+            key = normalize_question(q.get("question_text", ""))
+            if key:
+                questions.add(key, weight, example=q["question_text"])
+            theme = q.get("ask_type", "other")
+            themes.add(theme, weight)
+            theme_keys.add(theme)
+        for a in extracted["advice"]:
+            for tag in a.get("category_tags", []):
+                themes.add(tag, weight)
+                theme_keys.add(tag)
+
+    mean_weight = stats["chunks"] / stats["sampled_chunks"] if stats["sampled_chunks"] else 1.0
+    theme_bound = themes.error_bound()
+    total_theme = max(1.0, themes.total)
+    theme_rows = []
+    for theme in theme_keys:
+        est = themes.estimate(theme)
+        lo, hi = estimate_range(est, theme_bound, mean_weight)
+        theme_rows.append({"theme": theme, "est_frequency": est, "range": f"{fmt(lo)}-{fmt(hi)}", "share": round(est / total_theme, 4)})
+    theme_rows.sort(key=lambda r: (-r["est_frequency"], r["theme"]))
+
+    question_rows = []
+    for key, est, error in questions.top(50):
+        lo, hi = estimate_range(est, error, mean_weight)
+        question_rows.append({"canonical": questions.examples[key], "est_frequency": est, "range": f"{fmt(lo)}-{fmt(hi)}"})
+    for row in theme_rows + question_rows:
+        row["est_frequency"] = fmt(row["est_frequency"])
+
+    out = Path(args.outputs_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "themes_summary.md").write_text(
+        "# Themes Summary (preview)\n\n"
+        f"_Approximate: sampled {stats['sampled_chunks']} of {stats['chunks']} chunks "
+        f"from {stats['sampled_files']} of {stats['files']} files (seed {args.seed}), "
+        f"{kept} passed the keyword filter. Frequencies are scaled to the full corpus; "
+        "ranges cover sketch error plus ~95% sampling error._\n\n"
+        "## Ranked Themes\n"
+        + markdown_table(theme_rows, ["theme", "est_frequency", "range", "share"], 50)
+        + "\n## Top Questions\n"
+        + markdown_table(question_rows, ["canonical", "est_frequency", "range"], 50),
+        encoding="utf-8",
+    )
+    logging.info(
+        "preview sampled %s/%s chunks (%s kept) and wrote %s in %.1fs",
+        stats["sampled_chunks"],
+        stats["chunks"],
+        kept,
+        out / "themes_summary.md",
+        time.monotonic() - started,
+    )
+
+
+if __name__ == "__main__":
+    main()
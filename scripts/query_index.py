@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Query the index built by 06_build_index.py from the command line or over local HTTP."""
+from __future__ import annotations
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pipeline_index import chunk_ref, connect, search_canonical, search_items, source_excerpt
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Search extracted items and canonical libraries")
+    p.add_argument("text", nargs="?", help="full-text search terms")
+    p.add_argument("--db", default="data/index.sqlite")
+    p.add_argument("--type", choices=["question", "concern", "advice", "workflow"])
+    p.add_argument("--ask-type")
+    p.add_argument("--tag", help="advice category tag")
+    p.add_argument("--file-id")
+    p.add_argument("--file-path", help="substring or glob matched against transcript paths")
+    p.add_argument("--since", help="only transcripts modified on or after this date (YYYY-MM-DD)")
+    p.add_argument("--until", help="only transcripts modified on or before this date (YYYY-MM-DD)")
+    p.add_argument("--quarter", help="only transcripts modified in this quarter, e.g. 2024-Q3")
+    p.add_argument("--canonical", action="store_true", help="search canonical rows instead of raw items")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--transcripts-root", help="print the source excerpt for each hit")
+    p.add_argument("--serve", action="store_true", help="serve /items, /canonical and /source as JSON")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    return p.parse_args()
+
+
+def make_handler(conn, transcripts_root: str | None):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:  # noqa: N802
+            url = urlparse(self.path)
+            q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                limit = int(q.get("limit", 50))
+            except ValueError:
+                self._send(400, {"error": "limit must be an integer"})
+                return
+            if url.path == "/items":
+                try:
+                    results = search_items(
+                        conn,
+                        text=q.get("q"),
+                        item_type=q.get("type"),
+                        ask_type=q.get("ask_type"),
+                        tag=q.get("tag"),
+                        file_id=q.get("file_id"),
+                        file_path=q.get("file_path"),
+                        since=q.get("since"),
+                        until=q.get("until"),
+                        quarter=q.get("quarter"),
+                        limit=limit,
+                    )
+                except ValueError as exc:
+                    self._send(400, {"error": str(exc)})
+                    return
+                self._send(200, results)
+            elif url.path == "/canonical":
+                self._send(200, search_canonical(conn, text=q.get("q"), item_type=q.get("type"), limit=limit))
+            elif url.path == "/source":
+                ref = chunk_ref(conn, q.get("chunk_id", ""))
+                if ref is None:
+                    self._send(404, {"error": "unknown chunk_id"})
+                    return
+                if transcripts_root:
+                    try:
+                        ref["excerpt"] = source_excerpt(transcripts_root, ref)
+                    except FileNotFoundError:
+                        ref["excerpt"] = None
+                self._send(200, ref)
+            else:
+                self._send(404, {"error": "use /items, /canonical or /source"})
+
+    return Handler
+
+
+def main() -> None:
+    args = parse_args()
+    conn = connect(args.db)
+
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(conn, args.transcripts_root))
+        print(f"serving {args.db} on http://{args.host}:{args.port}")
+        server.serve_forever()
+        return
+
+    if args.canonical:
+        results = search_canonical(conn, text=args.text, item_type=args.type, limit=args.limit)
+    else:
+        try:
+            results = search_items(
+                conn,
+                text=args.text,
+                item_type=args.type,
+                ask_type=args.ask_type,
+                tag=args.tag,
+                file_id=args.file_id,
+                file_path=args.file_path,
+                since=args.since,
+                until=args.until,
+                quarter=args.quarter,
+                limit=args.limit,
+            )
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from exc
+        if args.transcripts_root:
+            for hit in results:
+                try:
+                    hit["excerpt"] = source_excerpt(args.transcripts_root, hit["source_ref"])
+                except FileNotFoundError:
+                    hit["excerpt"] = None
+    for hit in results:
+        print(json.dumps(hit, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
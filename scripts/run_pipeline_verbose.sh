@@ -59,21 +59,48 @@ print_banner
 echo -e "${CYAN}📁 Transcript folder:${NC} ${TRANSCRIPTS_ROOT}"
 
 echo -e "${YELLOW}Tip:${NC} If you want to force rule-based extraction, set USE_RULE_BASED=1"
+echo -e "${YELLOW}Tip:${NC} Set STREAMING=1 to start extraction while files are still being ingested"
+echo -e "${YELLOW}Tip:${NC} Set PREVIEW=1 for a quick approximate themes summary instead of the full run"
+
+if [[ "${PREVIEW:-0}" == "1" ]]; then
+  run_step "Ingest transcript files" \
+    "python scripts/01_ingest.py --transcripts-root '${TRANSCRIPTS_ROOT}' --output data/ingest.parquet"
+  run_step "Preview themes from a sample" \
+    "python scripts/preview_themes.py --input data/ingest.parquet"
+  echo -e "\n${GREEN}${BOLD}🎉 Preview finished!${NC} Open ${BOLD}outputs/preview/themes_summary.md${NC}"
+  exit 0
+fi
 
 FILTER_CMD="python scripts/02_filter_jobsearch.py --input data/ingest.parquet --output data/jobsearch_chunks.parquet"
 EXTRACT_CMD="python scripts/03_extract_llm.py --input data/jobsearch_chunks.parquet --output data/extractions.jsonl"
 if [[ "${USE_RULE_BASED:-0}" == "1" ]]; then
   EXTRACT_CMD+=" --rule-based"
 fi
+if [[ "${CASCADE:-0}" == "1" ]]; then
+  EXTRACT_CMD+=" --routing cascade"
+fi
 
-run_step "Ingest transcript files" \
-  "python scripts/01_ingest.py --transcripts-root '${TRANSCRIPTS_ROOT}' --output data/ingest.parquet"
-run_step "Filter to job-search content" "${FILTER_CMD}"
-run_step "Extract questions/concerns/advice/workflows" "${EXTRACT_CMD}"
+if [[ "${STREAMING:-0}" == "1" ]]; then
+  STREAM_CMD="python scripts/stream_pipeline.py --transcripts-root '${TRANSCRIPTS_ROOT}' --output data/extractions.jsonl"
+  if [[ "${USE_RULE_BASED:-0}" == "1" ]]; then
+    STREAM_CMD+=" --rule-based"
+  fi
+  if [[ "${CASCADE:-0}" == "1" ]]; then
+    STREAM_CMD+=" --routing cascade"
+  fi
+  run_step "Stream ingest -> filter -> extract" "${STREAM_CMD}"
+else
+  run_step "Ingest transcript files" \
+    "python scripts/01_ingest.py --transcripts-root '${TRANSCRIPTS_ROOT}' --output data/ingest.parquet"
+  run_step "Filter to job-search content" "${FILTER_CMD}"
+  run_step "Extract questions/concerns/advice/workflows" "${EXTRACT_CMD}"
+fi
 run_step "Deduplicate and cluster similar items" \
   "python scripts/04_dedupe_cluster.py --input data/extractions.jsonl"
 run_step "Generate final markdown deliverables" \
   "python scripts/05_generate_outputs.py"
+run_step "Update local query index" \
+  "python scripts/06_build_index.py"
 
 echo -e "\n${GREEN}${BOLD}🎉 Pipeline run finished successfully!${NC}"
 echo -e "${CYAN}Next:${NC} open the ${BOLD}outputs/${NC} folder to read the reports."
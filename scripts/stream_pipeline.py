@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Streaming ingest -> keyword filter -> extraction over bounded queues.
+
+Chunks flow to extraction workers as soon as their file is read, so the
+first LLM calls start within seconds and results are appended to the
+output as they complete. Full queues block the stage upstream of them,
+which keeps memory bounded by ``--queue-size`` no matter the corpus size.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from pipeline_budget import RateLimiter, TokenBudget, check_cost_cap, model_pricing
+from pipeline_utils import (
+    ChunkConfig,
+    LineIndex,
+    dump_json,
+    iter_transcript_files,
+    load_json,
+    load_stage,
+    normalize_whitespace,
+    read_text_file,
+    setup_logging,
+    sha256_text,
+    stable_id,
+)
+
+_DONE = object()
+
+ingest_mod = load_stage("01_ingest.py", "ingest_stage")
+filter_mod = load_stage("02_filter_jobsearch.py", "filter_stage")
+extract_mod = load_stage("03_extract_llm.py", "extract_stage")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Run ingest, keyword filtering and extraction as a streaming pipeline")
+    p.add_argument("--transcripts-root", required=True)
+    p.add_argument("--output", default="data/extractions.jsonl")
+    p.add_argument("--cache", default="data/extraction_cache.json")
+    p.add_argument("--manifest", default="data/ingest_manifest.json", help="ingest manifest; streaming records each file's modified time here")
+    p.add_argument("--stats", default="data/extraction_stats.json")
+    p.add_argument("--chunk-tokens", type=int, default=1400)
+    p.add_argument("--overlap-ratio", type=float, default=0.15)
+    p.add_argument("--keywords-json", help="optional JSON list of keywords")
+    p.add_argument("--min-keyword-hits", type=int, default=1)
+    p.add_argument("--model", default="gpt-4o-mini")
+    p.add_argument("--rule-based", action="store_true", help="Use local heuristic extraction")
+    p.add_argument("--routing", choices=["llm", "cascade"], default="llm")
+    p.add_argument("--route-min-keyword-score", type=int, default=2)
+    p.add_argument("--route-min-heuristic-items", type=int, default=1)
+    p.add_argument("--near-dup-distance", type=int, default=3)
+    p.add_argument("--workers", type=int, default=4, help="concurrent extraction workers")
+    p.add_argument("--queue-size", type=int, default=64, help="max chunks buffered between stages")
+    p.add_argument("--max-tokens", type=int, help="hard cap on prompt+completion tokens for this run")
+    p.add_argument("--max-cost-usd", type=float, help="hard cap on estimated spend for this run")
+    p.add_argument("--max-rpm", type=int, help="ceiling on LLM requests per minute")
+    p.add_argument("--price-input", type=float, help="USD per 1M prompt tokens (overrides built-in pricing)")
+    p.add_argument("--price-output", type=float, help="USD per 1M completion tokens (overrides built-in pricing)")
+    p.add_argument("--dry-run", action="store_true", help="estimate LLM tokens, cost and time without calling the API")
+    args = p.parse_args()
+    check_cost_cap(p, args)
+    return args
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _run_stage(name: str, body: Callable[[], None], stop: threading.Event, errors: list[BaseException]) -> threading.Thread:
+    def target() -> None:
+        try:
+            body()
+        except BaseException as exc:  # noqa: BLE001
+            logging.exception("stream stage %s failed", name)
+            errors.append(exc)
+            stop.set()
+
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    args = parse_args()
+    setup_logging("stream_pipeline")
+
+    root = Path(args.transcripts_root)
+    cfg = ChunkConfig(chunk_tokens=args.chunk_tokens, overlap_ratio=args.overlap_ratio)
+    keywords = filter_mod.compile_keywords(args.keywords_json)
+    scanner = filter_mod.KeywordScanner(keywords)
+    # file_id -> (content_hash, LineIndex); filled by the ingest stage before a file's chunks are queued.
+    line_index: dict[str, tuple[str, LineIndex]] = {}
+    cache_path = Path(args.cache)
+    pricing = model_pricing(args.model, args.price_input, args.price_output)
+    extractor = extract_mod.ChunkExtractor(
+        args.model,
+        load_json(cache_path, default={}),
+        rule_based=args.rule_based,
+        routing=args.routing,
+        policy=extract_mod.RoutingPolicy(
+            min_keyword_score=args.route_min_keyword_score,
+            min_heuristic_items=args.route_min_heuristic_items,
+        ),
+        near_dup_distance=args.near_dup_distance,
+        dry_run=args.dry_run,
+        budget=TokenBudget(args.model, args.max_tokens, args.max_cost_usd, pricing),
+        limiter=RateLimiter(args.max_rpm),
+        line_index=line_index,
+    )
+
+    workers = max(1, args.workers)
+    chunks_q: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    extract_q: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    results_q: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    counts = {"files": 0, "chunks": 0, "kept": 0}
+    manifest_path = Path(args.manifest)
+    manifest = load_json(manifest_path, default={})
+    seen_paths: set[str] = set()
+
+    def ingest() -> None:
+        try:
+            for file in sorted(set(iter_transcript_files(root))):
+                raw = read_text_file(file)
+                text = normalize_whitespace(raw)
+                rel_path = str(file.relative_to(root))
+                content_hash = sha256_text(text)
+                mtime = file.stat().st_mtime
+                rows = ingest_mod.chunk_rows(text, rel_path, file.name, mtime, content_hash, cfg)
+                seen_paths.add(rel_path)
+                prior = manifest.get(rel_path)
+                if not prior or prior.get("content_hash") != content_hash:
+                    # No ingest table is written here, so the hash is left out and
+                    # the next batch ingest re-chunks this file instead of reusing rows.
+                    manifest[rel_path] = {"file_id": stable_id(rel_path), "modified_time": mtime}
+                if rows:
+                    line_index[rows[0]["file_id"]] = (content_hash, LineIndex.from_text(raw))
+                counts["files"] += 1
+                for row in rows:
+                    counts["chunks"] += 1
+                    if not _put(chunks_q, row, stop):
+                        return
+        finally:
+            _put(chunks_q, _DONE, stop)
+
+    def keyword_filter() -> None:
+        try:
+            while (row := _get(chunks_q, stop)) is not _DONE:
+                hits = scanner.hits(str(row.get("text", "")))
+                row["keyword_hits"] = hits
+                row["keyword_score"] = len(hits)
+                if row["keyword_score"] >= args.min_keyword_hits:
+                    counts["kept"] += 1
+                    if not _put(extract_q, row, stop):
+                        return
+        finally:
+            for _ in range(workers):
+                _put(extract_q, _DONE, stop)
+
+    def extract_worker() -> None:
+        try:
+            while (row := _get(extract_q, stop)) is not _DONE:
+                if not _put(results_q, extractor.extract(row), stop):
+                    return
+        finally:
+            _put(results_q, _DONE, stop)
+
+    started = time.monotonic()
+    threads = [
+        _run_stage("ingest", ingest, stop, errors),
+        _run_stage("filter", keyword_filter, stop, errors),
+        *[_run_stage(f"extract-{i}", extract_worker, stop, errors) for i in range(workers)],
+    ]
+
+    output_path = Path(args.output)
+    written = 0
+    finished_workers = 0
+    with extractor.open_output(output_path) as handle:
+        while finished_workers < workers:
+            record = _get(results_q, stop)
+            if record is _DONE:
+                if stop.is_set():
+                    break
+                finished_workers += 1
+                continue
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            handle.flush()
+            written += 1
+            if written == 1:
+                logging.info("first extraction written after %.1fs", time.monotonic() - started)
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    if not args.dry_run:
+        # 06_build_index.py reads transcript dates from the manifest.
+        for stale_path in set(manifest) - seen_paths:
+            manifest.pop(stale_path)
+        dump_json(manifest_path, manifest)
+    extractor.save_cache(cache_path)
+    dump_json(Path(args.stats), extractor.run_stats(concurrency=workers))
+    logging.info(
+        "streamed %s files, %s chunks, kept %s, wrote %s extractions to %s in %.1fs",
+        counts["files"],
+        counts["chunks"],
+        counts["kept"],
+        written,
+        output_path,
+        time.monotonic() - started,
+    )
+
+
+if __name__ == "__main__":
+    main()
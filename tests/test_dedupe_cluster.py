@@ -0,0 +1,56 @@
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pipeline_io import read_rows, write_rows
+
+
+def load_module(path: str, module_name: str):
+    spec = spec_from_file_location(module_name, path)
+    module = module_from_spec(spec)
+    assert spec.loader is not None
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+dedupe_mod = load_module("scripts/04_dedupe_cluster.py", "dedupe_mod")
+
+
+def _record(chunk_id: str, file_path: str, questions: list[str], duplicate_of: str | None = None) -> dict:
+    return {
+        "chunk_id": chunk_id,
+        "source_ref": {"file_id": file_path, "chunk_id": chunk_id, "file_path": file_path},
+        "duplicate_of": duplicate_of,
+        "questions": [{"question_text": q, "ask_type": "resume", "confidence": 0.5} for q in questions],
+    }
+
+
+def test_near_duplicate_items_join_their_head_items_cluster(tmp_path: Path, monkeypatch):
+    extractions = tmp_path / "extractions.jsonl"
+    write_rows(
+        str(extractions),
+        [
+            _record("h1", "original.txt", ["Should I rewrite my resume summary?", "How do I negotiate salary?"]),
+            _record("d1", "resubmitted.txt", ["Should I rewrite my resume summary?", "How do I negotiate salary?"], duplicate_of="h1"),
+        ],
+    )
+    outputs = {name: tmp_path / f"{name}.jsonl" for name in ("questions", "concerns", "advice", "workflows", "themes")}
+    argv = ["04_dedupe_cluster.py", "--input", str(extractions)]
+    for name, path in outputs.items():
+        argv += [f"--{name}-output", str(path)]
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", argv)
+
+    dedupe_mod.main()
+
+    rows = {row["canonical"]: row for row in read_rows(str(outputs["questions"]))}
+    assert len(rows) == 2
+    for row in rows.values():
+        refs = [json.loads(ref) for ref in row["top_source_refs"].split(" || ")]
+        assert row["frequency"] == 2
+        assert [ref["file_path"] for ref in refs] == ["original.txt", "resubmitted.txt"]
+        assert [ref["chunk_id"] for ref in refs] == ["h1", "d1"]
@@ -9,6 +9,7 @@ def load_module(path: str, module_name: str):
     spec = spec_from_file_location(module_name, path)
     module = module_from_spec(spec)
     assert spec.loader is not None
+    sys.modules[module_name] = module
     spec.loader.exec_module(module)
     return module
 
@@ -29,6 +30,14 @@ def test_keyword_hits_finds_expected_terms():
     assert hits == ["resume", "linkedin"]
 
 
+def test_keyword_hits_accepts_compiled_patterns_and_plain_keywords():
+    text = "Send the CV to the recruiter."
+    keywords = ("recruiter", "cv", "ats")
+
+    assert filter_mod.keyword_hits(text, keywords) == ["recruiter", "cv"]
+    assert filter_mod.keyword_hits(text, filter_mod.compile_keyword_patterns(list(keywords))) == ["recruiter", "cv"]
+
+
 def test_classify_ask_type_resume_detection():
     ask_type = extract_mod.classify_ask_type("How can I improve my resume for ATS?")
     assert ask_type == "resume"
@@ -40,10 +49,146 @@ def test_heuristic_extract_builds_questions_concerns_and_advice():
         "What should I do next? "
         "You should focus on networking every week."
     )
-    source_ref = {"chunk_id": "c1"}
-
-    extracted = extract_mod.heuristic_extract(text, source_ref)
+    extracted = extract_mod.heuristic_extract(text)
 
     assert len(extracted["questions"]) == 1
     assert len(extracted["concerns"]) >= 1
     assert len(extracted["advice"]) >= 1
+    assert all("source_ref" not in item for items in extracted.values() for item in items)
+
+
+class _FakeResponses:
+    def __init__(self, verdicts: dict[str, bool]):
+        self.verdicts = verdicts
+        self.calls = 0
+
+    def create(self, model: str, input: str):
+        self.calls += 1
+        verdict = any(marker in input for marker, flag in self.verdicts.items() if flag)
+        return type("Resp", (), {"output_text": f'{{"job_search": {str(verdict).lower()}}}'})()
+
+
+class _FakeClient:
+    def __init__(self, verdicts: dict[str, bool]):
+        self.responses = _FakeResponses(verdicts)
+
+
+def test_classify_texts_caches_by_content_and_skips_repeat_calls():
+    client = _FakeClient({"resume": True})
+    cache: dict = {}
+    texts = ["Fix your resume.", "Weekend plans.", "Fix your resume."]
+
+    first = filter_mod.classify_texts(client, "gpt-test", texts, cache, concurrency=2)
+    second = filter_mod.classify_texts(client, "gpt-test", texts, cache, concurrency=2)
+
+    assert first == [True, False, True]
+    assert second == first
+    assert client.responses.calls == 2
+    assert filter_mod.classifier_cache_key("other-model", texts[0]) not in cache
+
+
+def test_route_chunk_escalates_only_promising_chunks():
+    policy = extract_mod.RoutingPolicy(min_keyword_score=2, min_heuristic_items=1)
+    found = extract_mod.heuristic_extract("What should I change on my resume?")
+    empty = extract_mod.heuristic_extract("We chatted about the weekend.")
+
+    assert extract_mod.route_chunk(3, found, policy) == "llm"
+    assert extract_mod.route_chunk(1, found, policy) == "heuristic"
+    assert extract_mod.route_chunk(3, empty, policy) == "heuristic"
+
+
+class _FakeExtractClient:
+    def __init__(self):
+        self.responses = self
+        self.calls = 0
+
+    def create(self, model: str, input: str):
+        self.calls += 1
+        payload = '{"questions": [{"question_text": "From the model?"}], "concerns": [], "advice": [], "workflows": []}'
+        return type("Resp", (), {"output_text": payload})()
+
+
+def _extractor(cache: dict, client: _FakeExtractClient, **kwargs):
+    extractor = extract_mod.ChunkExtractor("gpt-test", cache, near_dup_distance=-1, **kwargs)
+    extractor._client = client
+    return extractor
+
+
+def test_rule_based_cache_entries_are_upgraded_by_llm_runs(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    row = {"chunk_id": "c1", "text": "What should I change on my resume?", "keyword_score": 1}
+    cache: dict = {}
+    client = _FakeExtractClient()
+
+    assert _extractor(cache, client, routing="cascade").extract(row)["route"] == "heuristic"
+    assert _extractor(cache, client, rule_based=True).extract(row)["route"] == "cache"
+    assert _extractor(cache, client).extract(row)["route"] == "llm"
+    assert _extractor(cache, client, routing="cascade").extract(row)["route"] == "cache"
+    assert client.calls == 1
+
+
+def test_budget_fallbacks_are_not_cached(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    rows = [{"chunk_id": f"c{i}", "text": f"What should I change on resume {i}?"} for i in range(2)]
+    cache: dict = {}
+    client = _FakeExtractClient()
+    capped = _extractor(cache, client, budget=extract_mod.TokenBudget("gpt-test", max_tokens=1500))
+
+    assert [capped.extract(row)["route"] for row in rows] == ["llm", "llm_failed"]
+    assert [_extractor(cache, client).extract(row)["route"] for row in rows] == ["cache", "llm"]
+
+
+def test_compact_extraction_strips_inline_source_refs():
+    legacy = {"questions": [{"question_text": "Why?", "source_ref": {"chunk_id": "c1"}}], "advice": []}
+
+    compact = extract_mod.compact_extraction(legacy)
+
+    assert compact["questions"] == [{"question_text": "Why?"}]
+    assert compact["workflows"] == []
+
+
+def test_keyword_scanner_matches_per_keyword_search():
+    keywords = filter_mod.DEFAULT_KEYWORDS + ["job", "job search", "search", "Resume", "hiring", "hiring manager"]
+    scanner = filter_mod.KeywordScanner(keywords)
+    patterns = filter_mod.compile_keyword_patterns(keywords)
+    texts = [
+        "My job search is stalled. Any LinkedIn tips for the hiring manager?",
+        "Send the CV; the ATS rejected my résumé and my resume.",
+        "Searching for jobs is tiring, no keywords here.",
+        "",
+    ]
+
+    for text in texts:
+        assert scanner.hits(text) == filter_mod.keyword_hits(text, patterns)
+
+
+def test_heuristic_extract_finds_workflows_from_line_index():
+    from pipeline_utils import LineIndex, normalize_whitespace
+
+    raw = "Here is the plan.\n1. Audit your resume\n2. Message five contacts\n3. Track every reply\n"
+    text = normalize_whitespace(raw)
+    numbered_lines = LineIndex.from_text(raw).window(text, 0, len(text.split()))
+
+    assert extract_mod.heuristic_extract(text)["workflows"] == []
+    workflow = extract_mod.heuristic_extract(text, numbered_lines)["workflows"][0]
+    assert workflow["steps"] == ["1. Audit your resume", "2. Message five contacts", "3. Track every reply"]
+
+
+def test_resubmitted_transcript_reuses_cached_near_duplicate_heads(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    original = [{"chunk_id": f"a{i}", "text": f"Session {i}: what should I change on my resume for the {i} role? " * 20} for i in range(3)]
+    resubmitted = [{**row, "chunk_id": f"b{i}"} for i, row in enumerate(original)]
+    cache: dict = {}
+    client = _FakeExtractClient()
+
+    first = extract_mod.ChunkExtractor("gpt-test", cache)
+    first._client = client
+    [first.extract(row) for row in original]
+    second = extract_mod.ChunkExtractor("gpt-test", cache)
+    second._client = client
+    records = [second.extract(row) for row in original + resubmitted]
+
+    assert client.calls == 3
+    assert second.routes == {"cache": 3, "near_duplicate": 3}
+    assert [r["duplicate_of"] for r in records[3:]] == ["a0", "a1", "a2"]
+    assert records[3]["questions"] == records[0]["questions"]
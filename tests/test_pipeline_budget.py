@@ -0,0 +1,68 @@
+import argparse
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pipeline_budget import BudgetExceeded, TokenBudget, check_cost_cap, create_response, project_run
+
+
+class _Usage:
+    input_tokens = 120
+    output_tokens = 30
+
+
+class _FakeResponses:
+    def create(self, model: str, input: str):
+        return type("Resp", (), {"output_text": "{}", "usage": _Usage()})()
+
+
+class _FakeClient:
+    responses = _FakeResponses()
+
+
+def test_create_response_records_reported_usage():
+    budget = TokenBudget("gpt-4o-mini")
+
+    create_response(_FakeClient(), "gpt-4o-mini", "x" * 400, expected_completion_tokens=50, budget=budget)
+
+    summary = budget.summary()
+    assert summary["requests"] == 1
+    assert summary["prompt_tokens"] == 120
+    assert summary["completion_tokens"] == 30
+    assert summary["cost_usd"] is not None
+
+
+def test_token_budget_refuses_calls_past_hard_cap():
+    budget = TokenBudget("gpt-4o-mini", max_tokens=200)
+    create_response(_FakeClient(), "gpt-4o-mini", "x" * 100, expected_completion_tokens=20, budget=budget)
+
+    with pytest.raises(BudgetExceeded):
+        budget.reserve(40, 20)
+
+
+def test_cost_cap_requires_known_pricing():
+    with pytest.raises(ValueError):
+        TokenBudget("unknown-model", max_cost_usd=1.0)
+
+
+def test_cost_cap_without_pricing_is_a_usage_error(capsys):
+    parser = argparse.ArgumentParser(prog="03_extract_llm.py")
+    for flag in ("--model", "--max-cost-usd", "--price-input", "--price-output"):
+        parser.add_argument(flag)
+
+    with pytest.raises(SystemExit) as exc:
+        check_cost_cap(parser, parser.parse_args(["--model", "foo", "--max-cost-usd", "1"]))
+    assert exc.value.code == 2
+    assert "--price-input/--price-output" in capsys.readouterr().err
+    check_cost_cap(parser, parser.parse_args(["--model", "foo", "--max-cost-usd", "1", "--price-input", "1"]))
+
+
+def test_project_run_is_limited_by_rpm_ceiling():
+    projection = project_run([1000] * 120, 200, "gpt-4o-mini", concurrency=8, latency_s=1.0, max_rpm=60)
+
+    assert projection["requests"] == 120
+    assert projection["total_tokens"] == 120 * 1200
+    assert projection["wall_time_s"] == 120.0
@@ -0,0 +1,62 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pipeline_cluster import cluster_groups, cluster_text_indices, cluster_texts, near
+
+
+def _questions() -> list[dict]:
+    return [
+        {"question_text": "How do I negotiate my salary offer?", "ask_type": "negotiation"},
+        {"question_text": "How do I negotiate my salary offer??", "ask_type": "negotiation"},
+        {"question_text": "How should I tailor my resume for ATS?", "ask_type": "resume"},
+        {"question_text": "How do I negotiate my salary offers?", "ask_type": "other"},
+        {"question_text": "   ", "ask_type": "resume"},
+    ]
+
+
+def test_cluster_texts_groups_near_duplicates_and_skips_blank_text():
+    clusters = cluster_texts(_questions(), "question_text", 0.83)
+
+    assert [len(c) for c in clusters] == [3, 1]
+
+
+def test_blocked_clustering_merges_borderline_singletons_across_blocks():
+    (clusters,) = cluster_groups([(_questions(), "question_text", "ask_type")], 0.83, merge_max_size=1)
+
+    sizes = sorted(len(c) for c in clusters)
+    assert sizes == [1, 3]
+
+
+def test_process_pool_matches_serial_clustering():
+    groups = [(_questions(), "question_text", "ask_type"), (_questions(), "question_text", None)]
+
+    serial = cluster_groups(groups, 0.83, workers=1)
+    parallel = cluster_groups(groups, 0.83, workers=2)
+
+    assert serial == parallel
+    assert parallel[1][0][0] is groups[1][0][0]
+
+
+def _reference_indices(texts: list[str], threshold: float) -> list[list[int]]:
+    clusters: list[list[int]] = []
+    for idx, raw in enumerate(texts):
+        text = raw.strip()
+        if not text:
+            continue
+        for cluster in clusters:
+            if near(text, texts[cluster[0]], threshold):
+                cluster.append(idx)
+                break
+        else:
+            clusters.append([idx])
+    return clusters
+
+
+def test_indexed_clustering_matches_pairwise_reference():
+    base = [q["question_text"] for q in _questions()] + ["How do I negotiate?", "  a  ", "a", "A "]
+    texts = [variant for text in base for variant in (text, text.upper(), f" {text} ", text[: len(text) // 2], text)] * 3
+
+    for threshold in (0.5, 0.83, 0.95):
+        assert cluster_text_indices(texts, threshold) == _reference_indices(texts, threshold)
@@ -0,0 +1,83 @@
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pipeline_index import connect, search_canonical, search_items, source_excerpt, update_canonical, update_extractions
+
+
+def _record(chunk_id: str, question: str, tag: str) -> dict:
+    return {
+        "chunk_id": chunk_id,
+        "file_id": "f1",
+        "file_path": "2024/q3/call_1.txt",
+        "source_ref": {"file_id": "f1", "chunk_id": chunk_id, "start_offset": 2, "end_offset": 5, "file_path": "2024/q3/call_1.txt"},
+        "questions": [{"question_text": question, "ask_type": "negotiation", "confidence": 0.5}],
+        "concerns": [],
+        "advice": [{"advice": "Anchor high when you negotiate.", "category_tags": [tag], "confidence": 0.5}],
+        "workflows": [],
+    }
+
+
+def test_update_extractions_is_incremental(tmp_path: Path):
+    conn = connect(str(tmp_path / "index.sqlite"))
+
+    first = update_extractions(conn, [_record("c1", "How do I counter an offer?", "negotiation")])
+    second = update_extractions(
+        conn,
+        [_record("c1", "How do I counter an offer?", "negotiation"), _record("c2", "Should I ask for more?", "negotiation")],
+    )
+    third = update_extractions(conn, [_record("c2", "Should I ask for more money?", "negotiation")])
+
+    assert first["inserted"] == 1
+    assert second == {"inserted": 1, "updated": 0, "unchanged": 1, "removed": 0}
+    assert third == {"inserted": 0, "updated": 1, "unchanged": 0, "removed": 1}
+    assert [hit["text"] for hit in search_items(conn, item_type="question")] == ["Should I ask for more money?"]
+
+
+def test_search_items_filters_by_text_tag_and_path(tmp_path: Path):
+    conn = connect(str(tmp_path / "index.sqlite"))
+    update_extractions(conn, [_record("c1", "How do I counter an offer?", "negotiation")])
+
+    assert len(search_items(conn, tag="negotiation", file_path="q3")) == 1
+    assert search_items(conn, text="counter offer")[0]["source_ref"]["chunk_id"] == "c1"
+    assert search_items(conn, tag="resume") == []
+    assert search_items(conn, text='offer" OR *') == []
+
+
+def test_blank_text_query_applies_no_text_filter(tmp_path: Path):
+    conn = connect(str(tmp_path / "index.sqlite"))
+    update_extractions(conn, [_record("c1", "How do I counter an offer?", "negotiation")])
+
+    assert len(search_items(conn, text="   ", item_type="question")) == 1
+    assert search_canonical(conn, text="  ") == []
+
+
+def test_search_items_filters_by_quarter_of_modified_time(tmp_path: Path):
+    conn = connect(str(tmp_path / "index.sqlite"))
+    aug_2024 = datetime(2024, 8, 15, 12).timestamp()
+    update_extractions(conn, [_record("c1", "How do I counter an offer?", "negotiation")], {"f1": aug_2024})
+
+    assert len(search_items(conn, item_type="question", quarter="2024-Q3")) == 1
+    assert search_items(conn, item_type="question", quarter="2024-Q4") == []
+    assert search_items(conn, item_type="question", since="2024-08-16") == []
+    with pytest.raises(ValueError):
+        search_items(conn, quarter="Q3")
+
+
+def test_update_canonical_skips_unchanged_rows(tmp_path: Path):
+    conn = connect(str(tmp_path / "index.sqlite"))
+    rows = [{"type": "question", "canonical": "How do I negotiate salary?", "frequency": 4, "variants": ""}]
+
+    assert update_canonical(conn, "question", rows) is True
+    assert update_canonical(conn, "question", rows) is False
+    assert search_canonical(conn, text="salary")[0]["frequency"] == 4
+
+
+def test_source_excerpt_uses_word_offsets(tmp_path: Path):
+    (tmp_path / "call.txt").write_text("zero one\n two three  four five", encoding="utf-8")
+
+    assert source_excerpt(str(tmp_path), {"file_path": "call.txt", "start_offset": 1, "end_offset": 4}) == "one two three"
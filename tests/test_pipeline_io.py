@@ -1,9 +1,11 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
 
-from pipeline_io import markdown_table, read_rows, write_rows
+from pipeline_io import iter_rows, markdown_table, read_extractions, read_rows, write_rows
 
 
 def test_markdown_table_empty_message():
@@ -37,3 +39,33 @@ def test_read_rows_uses_jsonl_fallback_for_missing_parquet(tmp_path: Path):
     loaded = read_rows(str(parquet_path))
 
     assert loaded == [{"id": 1, "text": "fallback"}]
+
+
+def test_read_extractions_decodes_compact_and_legacy_records(tmp_path: Path):
+    ref = {"chunk_id": "c1", "file_id": "f1", "start_offset": 0, "end_offset": 9, "file_path": "a.txt"}
+    legacy_item = {"question_text": "Why?", "source_ref": ref}
+    path = tmp_path / "extractions.jsonl"
+    write_rows(
+        str(path),
+        [
+            {"chunk_id": "c1", "source_ref": ref, "questions": [{"question_text": "Why?"}]},
+            {"chunk_id": "c2", "source_ref": {**ref, "chunk_id": "c2"}, "duplicate_of": "c1", "questions": [legacy_item]},
+        ],
+    )
+
+    records = read_extractions(str(path))
+
+    assert [r.chunk_id for r in records] == ["c1", "c2"]
+    assert records[1].duplicate_of == "c1"
+    assert records[1].questions == [{"question_text": "Why?"}]
+    assert records[0].advice == []
+
+
+def test_iter_rows_streams_parquet_in_batches(tmp_path: Path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "ingest.parquet"
+    rows = [{"file_id": f"f{i % 3}", "text": f"chunk {i}"} for i in range(10)]
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+    assert list(iter_rows(str(path), batch_size=4)) == rows
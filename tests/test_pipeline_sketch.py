@@ -0,0 +1,50 @@
+from pathlib import Path
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pipeline_sketch import CountMinSketch, SpaceSaving, normalize_question, stratified_sample
+
+
+def test_normalize_question_ignores_case_and_punctuation():
+    assert normalize_question("How do I negotiate?!") == normalize_question("how do  I negotiate")
+
+
+def test_space_saving_keeps_heavy_hitters_within_error():
+    sketch = SpaceSaving(capacity=5)
+    for i in range(200):
+        sketch.add("salary", 1.0)
+        sketch.add(f"rare-{i}", 1.0)
+
+    key, count, error = sketch.top(1)[0]
+    assert key == "salary"
+    assert count - error <= 200 <= count
+
+
+def test_count_min_never_undercounts():
+    sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+    for i in range(500):
+        sketch.add(f"theme-{i % 50}", 2.0)
+
+    assert all(20 <= sketch.estimate(f"theme-{i}") <= 20 + sketch.error_bound() for i in range(50))
+
+
+def test_stratified_sample_weights_sum_to_corpus_size():
+    rows = [{"file_id": f"f{f}", "chunk_index": c} for f in range(10) for c in range(f + 1)]
+
+    sample, stats = stratified_sample(iter(rows), per_file=2, max_chunks=8, rng=random.Random(0))
+
+    assert stats["chunks"] == 55
+    assert len(sample) <= 8
+    assert abs(sum(weight for _, weight in sample) - 55) < 1e-9
+
+
+def test_stratified_sample_truncates_reservoirs_below_one_file():
+    rows = [{"file_id": "f0", "chunk_index": c} for c in range(10)] + [{"file_id": "f1", "chunk_index": c} for c in range(5)]
+
+    sample, stats = stratified_sample(iter(rows), per_file=3, max_chunks=2, rng=random.Random(0))
+
+    assert stats["sampled_files"] == 2
+    assert len(sample) == 2
+    assert abs(sum(weight for _, weight in sample) - 15) < 1e-9
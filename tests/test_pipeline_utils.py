@@ -3,7 +3,17 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
 
-from pipeline_utils import ChunkConfig, chunk_text, normalize_whitespace, sha256_text, stable_id
+from pipeline_utils import (
+    ChunkConfig,
+    LineIndex,
+    SimHashIndex,
+    chunk_text,
+    hamming_distance,
+    normalize_whitespace,
+    sha256_text,
+    simhash,
+    stable_id,
+)
 
 
 def test_sha256_text_is_deterministic():
@@ -34,3 +44,31 @@ def test_chunk_text_creates_multiple_windows_for_long_text():
     assert len(chunks) > 1
     assert chunks[0][1] == 0
     assert chunks[1][1] > chunks[0][1]
+
+
+def test_simhash_is_close_for_near_duplicates_and_far_for_unrelated_text():
+    base = " ".join(f"token{i}" for i in range(1000))
+    edited = base.replace("token500 ", "changed ")
+    unrelated = " ".join(f"other{i}" for i in range(1000))
+
+    assert hamming_distance(simhash(base), simhash(edited)) <= 3
+    assert hamming_distance(simhash(base), simhash(unrelated)) > 10
+
+
+def test_simhash_index_returns_earliest_match_within_distance():
+    index = SimHashIndex(max_distance=3)
+    first = index.add(0b1011)
+    index.add(0b1011 ^ (1 << 40))
+
+    assert index.find(0b1011 ^ (1 << 63)) == first
+    assert index.find(0b1011 ^ 0b1111 << 20) is None
+
+
+def test_line_index_windows_keep_only_whole_numbered_lines():
+    raw = "Intro line here. How do I start?\n1. Update resume\n2. Send outreach!\n3) Follow up\nThanks all"
+    text = normalize_whitespace(raw)
+    index = LineIndex.from_dict(LineIndex.from_text(raw).to_dict())
+    words = text.split()
+
+    assert index.window(text, 0, len(words)) == ["1. Update resume", "2. Send outreach!", "3) Follow up"]
+    assert index.window(" ".join(words[8:]), 8, len(words)) == ["2. Send outreach!", "3) Follow up"]
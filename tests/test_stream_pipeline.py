@@ -0,0 +1,106 @@
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+
+def load_module(path: str, module_name: str):
+    spec = spec_from_file_location(module_name, path)
+    module = module_from_spec(spec)
+    assert spec.loader is not None
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+stream_mod = load_module("scripts/stream_pipeline.py", "stream_mod")
+
+
+def _write_transcripts(tmp_path: Path) -> Path:
+    transcripts = tmp_path / "transcripts"
+    transcripts.mkdir()
+    for i in range(3):
+        body = " ".join(f"Session {i} line {n}: should I update my resume before the interview?" for n in range(120))
+        (transcripts / f"call_{i}.txt").write_text(body, encoding="utf-8")
+    (transcripts / "smalltalk.txt").write_text("We talked about the weather. " * 60, encoding="utf-8")
+    return transcripts
+
+
+def test_streaming_run_extracts_every_keyword_chunk(tmp_path: Path, monkeypatch):
+    transcripts = _write_transcripts(tmp_path)
+
+    output = tmp_path / "extractions.jsonl"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "stream_pipeline.py",
+            "--transcripts-root",
+            str(transcripts),
+            "--output",
+            str(output),
+            "--rule-based",
+            "--workers",
+            "3",
+            "--queue-size",
+            "2",
+            "--near-dup-distance",
+            "-1",
+        ],
+    )
+
+    stream_mod.main()
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert records
+    assert {r["source_ref"]["file_path"] for r in records} == {"call_0.txt", "call_1.txt", "call_2.txt"}
+    assert len({r["chunk_id"] for r in records}) == len(records)
+    assert all(r["questions"] for r in records)
+    manifest = json.loads((tmp_path / "data" / "ingest_manifest.json").read_text(encoding="utf-8"))
+    assert set(manifest) == {"call_0.txt", "call_1.txt", "call_2.txt", "smalltalk.txt"}
+    assert all("modified_time" in entry and "content_hash" not in entry for entry in manifest.values())
+
+
+def test_streaming_dry_run_projects_cascade_calls_with_custom_pricing(tmp_path: Path, monkeypatch):
+    transcripts = _write_transcripts(tmp_path)
+    output = tmp_path / "extractions.jsonl"
+    stats = tmp_path / "stats.json"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "stream_pipeline.py",
+            "--transcripts-root",
+            str(transcripts),
+            "--output",
+            str(output),
+            "--stats",
+            str(stats),
+            "--model",
+            "local-model",
+            "--routing",
+            "cascade",
+            "--route-min-keyword-score",
+            "1",
+            "--near-dup-distance",
+            "-1",
+            "--max-cost-usd",
+            "1",
+            "--price-input",
+            "0.5",
+            "--price-output",
+            "1.5",
+            "--dry-run",
+        ],
+    )
+
+    stream_mod.main()
+
+    summary = json.loads(stats.read_text(encoding="utf-8"))
+    assert not output.exists()
+    assert summary["routes"]["llm_planned"] == summary["projection"]["requests"] > 0
+    assert summary["projection"]["cost_usd"] > 0